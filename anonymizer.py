@@ -7,47 +7,111 @@ Usage:
     python anonymizer.py reverse output.txt restored.txt
 """
 
-import json
+import functools
+import re
 import sys
 import uuid
 from pathlib import Path
 from typing import Dict, List, Tuple
 
+import ahocorasick
 import fitz  # PyMuPDF
+import orjson
+import pypdfium2 as pdfium
 from presidio_analyzer import AnalyzerEngine, RecognizerResult
 from presidio_anonymizer import AnonymizerEngine
 from presidio_anonymizer.entities import OperatorConfig
 
+# Matches pseudonyms like "[PERSON_001]", capturing the "[PERSON_" head
+PSEUDONYM_RE = re.compile(r"(\[[A-Z]+_)\d+\]")
+
+# PII types passed to Presidio on every analyze call
+ENTITIES = (
+    "PERSON",
+    "EMAIL_ADDRESS", 
+    "PHONE_NUMBER",
+    "CREDIT_CARD",
+    "US_SSN",
+    "US_DRIVER_LICENSE",
+    "IP_ADDRESS",
+    "DATE_TIME",
+    "LOCATION",
+    "IBAN_CODE",
+    "US_BANK_NUMBER",
+    "US_PASSPORT",
+)
+
+# Entity type prefixes for readable pseudonyms
+ENTITY_PREFIXES = {
+    "PERSON": "PERSON",
+    "EMAIL_ADDRESS": "EMAIL",
+    "PHONE_NUMBER": "PHONE",
+    "CREDIT_CARD": "CARD",
+    "US_SSN": "SSN",
+    "US_DRIVER_LICENSE": "LICENSE",
+    "IP_ADDRESS": "IP",
+    "DATE_TIME": "DATE",
+    "NRP": "NRP",  # Nationality, Religion, Political group
+    "LOCATION": "LOCATION",
+    "IBAN_CODE": "IBAN",
+    "US_BANK_NUMBER": "BANK",
+    "US_PASSPORT": "PASSPORT",
+    "MEDICAL_LICENSE": "MEDLIC",
+}
+
+# Small integer id per entity type, resolved once per new value; the last
+# id is the "[PII_" fallback for types without a prefix
+ENTITY_IDS = {entity: entity_id for entity_id, entity in enumerate(ENTITY_PREFIXES)}
+DEFAULT_ENTITY_ID = len(ENTITY_PREFIXES)
+
+# Pre-formatted pseudonym heads indexed by entity id, e.g. "[PERSON_"
+PSEUDONYM_HEADS = tuple(f"[{prefix}_" for prefix in ENTITY_PREFIXES.values()) + ("[PII_",)
+HEAD_IDS = {head: entity_id for entity_id, head in enumerate(PSEUDONYM_HEADS)}
+
+# Pre-formatted counter tails "001]" .. "999]", shared by every entity type;
+# counters past the pool are formatted on demand
+COUNTER_TAILS = tuple(f"{counter:03d}]" for counter in range(1000))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_analyzer() -> AnalyzerEngine:
+    """Create the Presidio analyzer once; it loads the spaCy model."""
+    return AnalyzerEngine()
+
 
 class ReversibleAnonymizer:
     """Handles PII detection and reversible pseudonymization."""
     
+    __slots__ = (
+        "mapping_file",
+        "analyzer",
+        "anonymizer",
+        "original_to_pseudo",
+        "pseudo_to_original",
+        "entity_prefixes",
+        "_prefix_counters",
+        "_reverse_automaton",
+        "_reverse_automaton_size",
+    )
+    
     def __init__(self, mapping_file: str = "pii_mapping.json"):
         self.mapping_file = Path(mapping_file)
-        self.analyzer = AnalyzerEngine()
+        self.analyzer = _get_analyzer()
         self.anonymizer = AnonymizerEngine()
         
         # Mapping dictionaries
         self.original_to_pseudo: Dict[str, str] = {}
         self.pseudo_to_original: Dict[str, str] = {}
         
+        # Number of pseudonyms issued per entity id
+        self._prefix_counters: List[int] = [0] * len(PSEUDONYM_HEADS)
+        
+        # Automaton over pseudonyms, rebuilt only when the mappings change
+        self._reverse_automaton = None
+        self._reverse_automaton_size = -1
+        
         # Entity type prefixes for readable pseudonyms
-        self.entity_prefixes = {
-            "PERSON": "PERSON",
-            "EMAIL_ADDRESS": "EMAIL",
-            "PHONE_NUMBER": "PHONE",
-            "CREDIT_CARD": "CARD",
-            "US_SSN": "SSN",
-            "US_DRIVER_LICENSE": "LICENSE",
-            "IP_ADDRESS": "IP",
-            "DATE_TIME": "DATE",
-            "NRP": "NRP",  # Nationality, Religion, Political group
-            "LOCATION": "LOCATION",
-            "IBAN_CODE": "IBAN",
-            "US_BANK_NUMBER": "BANK",
-            "US_PASSPORT": "PASSPORT",
-            "MEDICAL_LICENSE": "MEDLIC",
-        }
+        self.entity_prefixes = ENTITY_PREFIXES
         
         # Load existing mappings if available
         self._load_mappings()
@@ -55,19 +119,27 @@ class ReversibleAnonymizer:
     def _load_mappings(self):
         """Load existing mappings from file."""
         if self.mapping_file.exists():
-            with open(self.mapping_file, "r") as f:
-                data = json.load(f)
+            data = orjson.loads(self.mapping_file.read_bytes())
+            if "mappings" in data:
+                # pdfanon mapping file: one record per mapping
+                self.original_to_pseudo = {m["original"]: m["fake"] for m in data["mappings"]}
+                self.pseudo_to_original = {m["fake"]: m["original"] for m in data["mappings"]}
+            else:
                 self.original_to_pseudo = data.get("original_to_pseudo", {})
                 self.pseudo_to_original = data.get("pseudo_to_original", {})
-                print(f"Loaded {len(self.original_to_pseudo)} existing mappings")
+            for pseudonym in self.pseudo_to_original:
+                match = PSEUDONYM_RE.fullmatch(pseudonym)
+                head_id = HEAD_IDS.get(match.group(1)) if match else None
+                if head_id is not None:
+                    self._prefix_counters[head_id] += 1
+            print(f"Loaded {len(self.original_to_pseudo)} existing mappings")
     
     def _save_mappings(self):
         """Save mappings to file for later reversal."""
-        with open(self.mapping_file, "w") as f:
-            json.dump({
-                "original_to_pseudo": self.original_to_pseudo,
-                "pseudo_to_original": self.pseudo_to_original
-            }, f, indent=2)
+        self.mapping_file.write_bytes(orjson.dumps({
+            "original_to_pseudo": self.original_to_pseudo,
+            "pseudo_to_original": self.pseudo_to_original
+        }, option=orjson.OPT_INDENT_2))
         print(f"Saved {len(self.original_to_pseudo)} mappings to {self.mapping_file}")
     
     def _get_pseudonym(self, original: str, entity_type: str) -> str:
@@ -80,9 +152,13 @@ class ReversibleAnonymizer:
             return self.original_to_pseudo[normalized]
         
         # Create new pseudonym
-        prefix = self.entity_prefixes.get(entity_type, "PII")
-        counter = sum(1 for k in self.pseudo_to_original if k.startswith(f"[{prefix}_")) + 1
-        pseudonym = f"[{prefix}_{counter:03d}]"
+        entity_id = ENTITY_IDS.get(entity_type, DEFAULT_ENTITY_ID)
+        counter = self._prefix_counters[entity_id] + 1
+        self._prefix_counters[entity_id] = counter
+        if counter < len(COUNTER_TAILS):
+            pseudonym = PSEUDONYM_HEADS[entity_id] + COUNTER_TAILS[counter]
+        else:
+            pseudonym = f"{PSEUDONYM_HEADS[entity_id]}{counter:03d}]"
         
         # Store bidirectional mapping
         self.original_to_pseudo[normalized] = pseudonym
@@ -96,37 +172,44 @@ class ReversibleAnonymizer:
         if not pdf_path.exists():
             raise FileNotFoundError(f"PDF not found: {pdf_path}")
         
+        try:
+            page_texts = self._extract_pages_pdfium(pdf_path)
+        except pdfium.PdfiumError:
+            # pdfium can't open some files (e.g. encrypted); use PyMuPDF instead
+            with fitz.open(pdf_path) as doc:
+                page_texts = [page.get_text() for page in doc]
+        
         text_parts = []
-        with fitz.open(pdf_path) as doc:
-            for page_num, page in enumerate(doc, 1):
-                text = page.get_text()
-                if text.strip():
-                    text_parts.append(f"--- Page {page_num} ---\n{text}")
+        for page_num, text in enumerate(page_texts, 1):
+            if text.strip():
+                text_parts.append(f"--- Page {page_num} ---\n{text}")
         
         full_text = "\n\n".join(text_parts)
         print(f"Extracted {len(full_text)} characters from {len(text_parts)} pages")
         return full_text
     
+    def _extract_pages_pdfium(self, pdf_path: Path) -> List[str]:
+        """Extract the text of each page using pdfium's range extractor."""
+        page_texts = []
+        pdf = pdfium.PdfDocument(str(pdf_path))
+        try:
+            for page_index in range(len(pdf)):
+                page = pdf[page_index]
+                textpage = page.get_textpage()
+                page_texts.append(textpage.get_text_range().replace("\r\n", "\n"))
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+        return page_texts
+    
     def analyze_text(self, text: str, language: str = "en") -> List[RecognizerResult]:
         """Detect PII entities in text."""
         results = self.analyzer.analyze(
             text=text,
             language=language,
             # Detect common PII types
-            entities=[
-                "PERSON",
-                "EMAIL_ADDRESS", 
-                "PHONE_NUMBER",
-                "CREDIT_CARD",
-                "US_SSN",
-                "US_DRIVER_LICENSE",
-                "IP_ADDRESS",
-                "DATE_TIME",
-                "LOCATION",
-                "IBAN_CODE",
-                "US_BANK_NUMBER",
-                "US_PASSPORT",
-            ]
+            entities=ENTITIES,
         )
         print(f"Found {len(results)} PII entities")
         return results
@@ -136,20 +219,26 @@ class ReversibleAnonymizer:
         if not results:
             return text
         
-        # Sort results by start position (descending) to replace from end to start
-        # This preserves character positions during replacement
-        sorted_results = sorted(results, key=lambda x: x.start, reverse=True)
+        # Walk results in position order, copying the gaps between them;
+        # the longest of several results starting together wins
+        sorted_results = sorted(results, key=lambda x: (x.start, -x.end))
         
-        anonymized = text
+        parts = []
+        cursor = 0
         for result in sorted_results:
+            if result.start < cursor:
+                # Overlaps a span that was already replaced
+                continue
             original_value = text[result.start:result.end]
-            pseudonym = self._get_pseudonym(original_value, result.entity_type)
-            anonymized = anonymized[:result.start] + pseudonym + anonymized[result.end:]
+            parts.append(text[cursor:result.start])
+            parts.append(self._get_pseudonym(original_value, result.entity_type))
+            cursor = result.end
+        parts.append(text[cursor:])
         
         # Save mappings after processing
         self._save_mappings()
         
-        return anonymized
+        return "".join(parts)
     
     def reverse_text(self, anonymized_text: str) -> str:
         """Reverse pseudonymization using stored mappings."""
@@ -157,11 +246,37 @@ class ReversibleAnonymizer:
             print("Warning: No mappings loaded. Cannot reverse.")
             return anonymized_text
         
-        restored = anonymized_text
-        for pseudonym, original in self.pseudo_to_original.items():
-            restored = restored.replace(pseudonym, original)
+        automaton = self._get_reverse_automaton()
         
-        return restored
+        # Collect every match in one pass, then keep the leftmost-longest ones
+        hits = sorted(
+            ((end - len(pseudonym) + 1, end + 1, pseudonym)
+             for end, pseudonym in automaton.iter(anonymized_text)),
+            key=lambda hit: (hit[0], -hit[1]),
+        )
+        
+        parts = []
+        cursor = 0
+        for start, end, pseudonym in hits:
+            if start < cursor:
+                continue
+            parts.append(anonymized_text[cursor:start])
+            parts.append(self.pseudo_to_original[pseudonym])
+            cursor = end
+        parts.append(anonymized_text[cursor:])
+        
+        return "".join(parts)
+    
+    def _get_reverse_automaton(self) -> ahocorasick.Automaton:
+        """Build (or reuse) an Aho-Corasick automaton over all pseudonyms."""
+        if self._reverse_automaton_size != len(self.pseudo_to_original):
+            automaton = ahocorasick.Automaton()
+            for pseudonym in self.pseudo_to_original:
+                automaton.add_word(pseudonym, pseudonym)
+            automaton.make_automaton()
+            self._reverse_automaton = automaton
+            self._reverse_automaton_size = len(self.pseudo_to_original)
+        return self._reverse_automaton
     
     def process_pdf(self, pdf_path: str, output_path: str) -> Tuple[str, str]:
         """Full pipeline: PDF -> extracted text -> anonymized text."""
@@ -2,7 +2,7 @@
 
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 import typer
 from rich.console import Console
@@ -10,7 +10,11 @@ from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.table import Table
 
 from . import __version__
-from .core.anonymizer import Anonymizer, process_directory
+
+if TYPE_CHECKING:
+    # The pipeline pulls in Presidio and spaCy (seconds to import), so
+    # commands import it only when they need it; --help and --version stay instant
+    from .core.anonymizer import Anonymizer
 
 app = typer.Typer(
     name="pdfanon",
@@ -64,6 +68,19 @@ def anonymize(
         False, "--verbose",
         help="Show detailed output including detected PII.",
     ),
+    workers: int = typer.Option(
+        1, "--workers", "-j",
+        help="Parallel processes: detection for directories, redaction for large PDFs "
+        "(0 = one per CPU).",
+    ),
+    cache_dir: Optional[Path] = typer.Option(
+        None, "--cache-dir",
+        help="Cache detections here so unchanged files skip PII detection on re-runs.",
+    ),
+    gpu: bool = typer.Option(
+        False, "--gpu",
+        help="Run name/location detection with spaCy's transformer model on a GPU.",
+    ),
 ):
     """
     Anonymize PII in PDF files.
@@ -74,6 +91,7 @@ def anonymize(
     Examples:
         pdfanon anonymize document.pdf
         pdfanon anonymize ./documents/ -o ./anonymized/
+        pdfanon anonymize ./documents/ --workers 4
         pdfanon anonymize report.pdf -o report_safe.pdf --verbose
     """
     input_path = Path(input_path)
@@ -85,10 +103,14 @@ def anonymize(
 
     if input_path.is_file():
         # Single file processing
-        _anonymize_single_file(input_path, output, mapping, seed, format, verbose)
+        _anonymize_single_file(
+            input_path, output, mapping, seed, format, verbose, cache_dir, gpu, workers
+        )
     else:
         # Directory processing
-        _anonymize_directory(input_path, output, mapping, seed, format, verbose)
+        _anonymize_directory(
+            input_path, output, mapping, seed, format, verbose, workers, cache_dir, gpu
+        )
 
 
 def _anonymize_single_file(
@@ -98,6 +120,9 @@ def _anonymize_single_file(
     seed: int,
     format: str,
     verbose: bool,
+    cache_dir: Optional[Path] = None,
+    gpu: bool = False,
+    workers: int = 1,
 ):
     """Process a single PDF file."""
     # Determine output path
@@ -109,8 +134,13 @@ def _anonymize_single_file(
 
     console.print(f"Processing: [cyan]{input_path.name}[/cyan]")
 
+    from .core.anonymizer import Anonymizer
+
     try:
-        anonymizer = Anonymizer(mapping_file=mapping, seed=seed)
+        anonymizer = Anonymizer(
+            mapping_file=mapping, seed=seed, cache_dir=cache_dir, use_gpu=gpu,
+            page_workers=workers or None,
+        )
 
         with Progress(
             SpinnerColumn(),
@@ -148,6 +178,9 @@ def _anonymize_directory(
     seed: int,
     format: str,
     verbose: bool,
+    workers: int = 1,
+    cache_dir: Optional[Path] = None,
+    gpu: bool = False,
 ):
     """Process all PDFs in a directory."""
     # Determine output directory
@@ -162,6 +195,8 @@ def _anonymize_directory(
         console.print(f"[yellow]No PDF files found in {input_dir}[/yellow]")
         raise typer.Exit(0)
 
+    from .core.anonymizer import process_directory
+
     console.print(f"Found [cyan]{len(pdf_files)}[/cyan] PDF file(s) in [cyan]{input_dir}[/cyan]")
     console.print(f"Output directory: [cyan]{output}[/cyan]\n")
 
@@ -182,6 +217,9 @@ def _anonymize_directory(
             output_format=format,
             seed=seed,
             progress_callback=callback,
+            workers=workers or None,
+            cache_dir=cache_dir,
+            use_gpu=gpu,
         )
 
     # Summary
@@ -201,7 +239,7 @@ def _anonymize_directory(
     console.print(f"\nMapping file: [cyan]{mapping}[/cyan]")
 
 
-def _show_detections_table(detections: list, anonymizer: Anonymizer):
+def _show_detections_table(detections: list, anonymizer: "Anonymizer"):
     """Display a table of detected PII and their replacements."""
     table = Table(title="Detected PII")
     table.add_column("Type", style="cyan")
@@ -266,7 +304,9 @@ def reverse(
     input_path = Path(input_path)
     format = format.lower()
 
-    if not mapping.exists():
+    from .faker.mapping import mapping_exists
+
+    if not mapping_exists(mapping):
         console.print(f"[red]Error:[/red] Mapping file not found: {mapping}")
         console.print("The mapping file is required to reverse anonymization.")
         raise typer.Exit(1)
@@ -281,6 +321,8 @@ def reverse(
     console.print(f"Reversing: [cyan]{input_path.name}[/cyan]")
     console.print(f"Using mapping: [cyan]{mapping}[/cyan]")
 
+    from .core.anonymizer import Anonymizer
+
     try:
         anonymizer = Anonymizer(mapping_file=mapping)
         count = anonymizer.reverse_pdf(input_path, output, format)
@@ -315,14 +357,20 @@ def mappings(
     Examples:
         pdfanon mappings
         pdfanon mappings --format json
+        pdfanon mappings -m pii_mapping.db --format json > pii_mapping.json
         pdfanon mappings -m custom_mapping.json --format csv
     """
-    if not mapping_file.exists():
+    from .faker.mapping import mapping_exists, open_mapping_store
+
+    if not mapping_exists(mapping_file):
         console.print(f"[yellow]No mapping file found at {mapping_file}[/yellow]")
         raise typer.Exit(0)
 
-    from .faker.mapping import MappingStore
-    store = MappingStore(mapping_file)
+    try:
+        store = open_mapping_store(mapping_file)
+    except ValueError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
     all_mappings = store.get_mappings_list()
 
     if not all_mappings:
@@ -332,8 +380,14 @@ def mappings(
     format = format.lower()
 
     if format == "json":
-        import json
-        console.print(json.dumps(all_mappings, indent=2))
+        import orjson
+        # Same shape as a JSON mapping file, so the export loads back with -m;
+        # written raw because rich would wrap long lines
+        sys.stdout.flush()
+        sys.stdout.buffer.write(
+            orjson.dumps(store.snapshot(), option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+        )
+        sys.stdout.buffer.flush()
 
     elif format == "csv":
         console.print("original,fake,type,document")
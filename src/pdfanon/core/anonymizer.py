@@ -1,12 +1,22 @@
 """Main anonymization pipeline orchestrator."""
 
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
 
 from ..faker.generator import DeterministicFakeGenerator
-from ..faker.mapping import MappingStore
-from .detector import PIIDetector
+from ..faker.mapping import open_mapping_store
+from .cache import DetectionCache
 from .pdf_handler import PDFHandler
+from .replacer import TextReplacer
+
+if TYPE_CHECKING:
+    # Importing the detector pulls in Presidio and spaCy; done lazily so
+    # reversal and other detection-free paths start quickly
+    from .detector import PIIDetector
 
 
 class Anonymizer:
@@ -21,18 +31,47 @@ class Anonymizer:
         mapping_file: Path,
         seed: int = 42,
         language: str = "en",
+        cache_dir: Optional[Path] = None,
+        use_gpu: bool = False,
+        page_workers: Optional[int] = 1,
     ):
         self.mapping_file = mapping_file
-        self.mapping_store = MappingStore(mapping_file)
-        self.detector = PIIDetector(language=language)
+        self.language = language
+        self.use_gpu = use_gpu
+        self.mapping_store = open_mapping_store(mapping_file)
+        self._detector: Optional["PIIDetector"] = None
+        # Optional on-disk cache so unchanged documents skip detection
+        self.cache_dir = cache_dir
+        self.detection_cache = DetectionCache(cache_dir) if cache_dir else None
         self.generator = DeterministicFakeGenerator(base_seed=seed)
-        self.pdf_handler = PDFHandler()
+        self.pdf_handler = PDFHandler(page_workers=page_workers)
+
+        # Reverse replacer is rebuilt only when the mapping set changes
+        self._reverse_replacer: Optional[TextReplacer] = None
+        self._reverse_replacer_size = -1
+
+    @property
+    def detector(self) -> "PIIDetector":
+        """PII detector, loaded on first use (it pulls in the spaCy model)."""
+        if self._detector is None:
+            from .detector import PIIDetector
+            self._detector = PIIDetector(language=self.language, use_gpu=self.use_gpu)
+        return self._detector
+
+    @property
+    def model_name(self) -> str:
+        """spaCy model the detector runs, resolved without loading it."""
+        if self._detector is not None:
+            return self._detector.model_name
+        from .detector import select_spacy_model
+        return select_spacy_model(self.use_gpu)
 
     def anonymize_pdf(
         self,
         input_path: Path,
         output_path: Path,
         output_format: str = "pdf",
+        save_mappings: bool = True,
     ) -> Tuple[int, List[dict]]:
         """
         Anonymize a PDF file.
@@ -41,16 +80,35 @@ class Anonymizer:
             input_path: Path to the input PDF
             output_path: Path for the anonymized output
             output_format: "pdf" or "txt"
+            save_mappings: Write the mapping file afterwards. Batch callers
+                pass False and call mapping_store.save() once at the end.
 
         Returns:
             Tuple of (number of entities replaced, list of detection results)
         """
-        # Extract text from PDF
-        text = self.pdf_handler.extract_text(input_path)
+        # Extract text from PDF, keeping page boundaries for batched detection
+        text, pages = self.pdf_handler.extract_text_with_offsets(input_path)
 
         # Detect PII
-        detections = self.detector.detect_with_context(text)
+        detections = _detect_cached(
+            lambda: self.detector, self.detection_cache, text, pages, self.language,
+            self.model_name if self.detection_cache else None,
+        )
+
+        return self._write_anonymized(
+            input_path, output_path, text, detections, output_format, save_mappings
+        )
 
+    def _write_anonymized(
+        self,
+        input_path: Path,
+        output_path: Path,
+        text: str,
+        detections: List[dict],
+        output_format: str,
+        save_mappings: bool = True,
+    ) -> Tuple[int, List[dict]]:
+        """Assign fake values for the detections and write the anonymized output."""
         if not detections:
             # No PII found, copy original
             if output_format == "pdf":
@@ -61,10 +119,13 @@ class Anonymizer:
                 self.pdf_handler.save_text(text, output_path)
             return 0, []
 
-        # Generate fake replacements for each detected PII
+        # Generate fake replacements for each distinct detected PII value;
+        # documents often repeat the same name or email many times
         replacements = {}
         for detection in detections:
             original = detection["value"]
+            if original in replacements:
+                continue
             entity_type = detection["entity_type"]
 
             fake = self.mapping_store.get_or_create_fake(
@@ -76,7 +137,8 @@ class Anonymizer:
             replacements[original] = fake
 
         # Save mappings
-        self.mapping_store.save()
+        if save_mappings:
+            self.mapping_store.save()
 
         # Create anonymized output
         if output_format == "pdf":
@@ -95,11 +157,15 @@ class Anonymizer:
 
     def _replace_text(self, text: str, replacements: dict) -> str:
         """Replace all occurrences in text."""
-        result = text
-        # Sort by length (longest first) to avoid partial replacements
-        for original in sorted(replacements.keys(), key=len, reverse=True):
-            result = result.replace(original, replacements[original])
-        return result
+        # Single pass; overlapping originals resolve to the longest match
+        return TextReplacer(replacements).replace(text)
+
+    def _get_reverse_replacer(self) -> TextReplacer:
+        """Get a replacer for fake -> original, rebuilt when mappings change."""
+        if self._reverse_replacer is None or self._reverse_replacer_size != len(self.mapping_store):
+            self._reverse_replacer = TextReplacer(self.mapping_store.get_all_reverse_mappings())
+            self._reverse_replacer_size = len(self.mapping_store)
+        return self._reverse_replacer
 
     def reverse_pdf(
         self,
@@ -118,28 +184,22 @@ class Anonymizer:
         Returns:
             Number of replacements made
         """
-        # Read the anonymized content
-        if input_path.suffix.lower() == ".pdf":
-            text = self.pdf_handler.extract_text(input_path)
-        else:
-            text = input_path.read_text()
-
-        # Get reverse mappings
-        reverse_map = self.mapping_store.get_all_reverse_mappings()
-
-        if not reverse_map:
+        if not len(self.mapping_store):
             raise ValueError(
                 f"No mappings found in {self.mapping_file}. "
                 "Cannot reverse anonymization without the mapping file."
             )
 
-        # Replace fake values with originals
-        restored_text = text
-        replacements_made = 0
-        for fake, original in reverse_map.items():
-            if fake in restored_text:
-                restored_text = restored_text.replace(fake, original)
-                replacements_made += 1
+        replacer = self._get_reverse_replacer()
+
+        if input_path.suffix.lower() != ".pdf":
+            return self._reverse_text_file(replacer, input_path, output_path, output_format)
+
+        # Replace fake values with originals in a single pass
+        text = self.pdf_handler.extract_text(input_path)
+        matches = replacer.find(text)
+        restored_text = replacer.apply(text, matches)
+        replacements_made = len({key for _, _, key in matches})
 
         # Save output
         if output_format == "pdf":
@@ -149,6 +209,41 @@ class Anonymizer:
 
         return replacements_made
 
+    def _reverse_text_file(
+        self,
+        replacer: TextReplacer,
+        input_path: Path,
+        output_path: Path,
+        output_format: str,
+    ) -> int:
+        """
+        Reverse a UTF-8 text file by scanning its bytes in place.
+
+        The file is memory-mapped and scanned as raw bytes, and the restored
+        output is assembled as bytes, so the document is decoded at most once
+        (only when it has to be laid out as a PDF).
+        """
+        with open(input_path, "rb") as f:
+            # mmap cannot map an empty file
+            if os.fstat(f.fileno()).st_size == 0:
+                data = b""
+            else:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                matches = replacer.find_bytes(data)
+                restored = replacer.apply_bytes(data, matches)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+
+        if output_format == "pdf":
+            self.pdf_handler.create_pdf_from_text(restored.decode("utf-8"), output_path)
+        else:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_bytes(restored)
+
+        return len({key for _, _, key in matches})
+
     def get_mapping_count(self) -> int:
         """Get the number of stored mappings."""
         return len(self.mapping_store)
@@ -165,6 +260,9 @@ def process_directory(
     output_format: str = "pdf",
     seed: int = 42,
     progress_callback=None,
+    workers: Optional[int] = 1,
+    cache_dir: Optional[Path] = None,
+    use_gpu: bool = False,
 ) -> List[Tuple[Path, int, Optional[str]]]:
     """
     Process all PDFs in a directory.
@@ -176,6 +274,10 @@ def process_directory(
         output_format: "pdf" or "txt"
         seed: Random seed for consistent fake data
         progress_callback: Optional callback(current, total, filename)
+        workers: Number of processes used for PII detection (None for one
+            per CPU). Each worker loads its own spaCy model.
+        cache_dir: Optional directory for the detection cache
+        use_gpu: Run NER with the transformer pipeline on a GPU if available
 
     Returns:
         List of (file_path, entities_found, error_message) tuples
@@ -186,29 +288,120 @@ def process_directory(
     if not pdf_files:
         return []
 
-    results = []
-    anonymizer = Anonymizer(mapping_file=mapping_file, seed=seed)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(pdf_files))
 
-    for i, pdf_path in enumerate(pdf_files):
-        if progress_callback:
-            progress_callback(i, len(pdf_files), pdf_path.name)
+    results = []
+    anonymizer = Anonymizer(
+        mapping_file=mapping_file, seed=seed, cache_dir=cache_dir, use_gpu=use_gpu
+    )
 
+    def output_path_for(pdf_path: Path) -> Path:
         # Compute relative path for output
         relative_path = pdf_path.relative_to(input_dir)
         if output_format == "pdf":
-            output_path = output_dir / relative_path
+            return output_dir / relative_path
+        return output_dir / relative_path.with_suffix(".txt")
+
+    try:
+        if workers <= 1:
+            for i, pdf_path in enumerate(pdf_files):
+                if progress_callback:
+                    progress_callback(i, len(pdf_files), pdf_path.name)
+
+                try:
+                    count, _ = anonymizer.anonymize_pdf(
+                        pdf_path, output_path_for(pdf_path), output_format,
+                        save_mappings=False,
+                    )
+                    results.append((pdf_path, count, None))
+                except Exception as e:
+                    results.append((pdf_path, 0, str(e)))
         else:
-            output_path = output_dir / relative_path.with_suffix(".txt")
-
-        try:
-            count, _ = anonymizer.anonymize_pdf(
-                pdf_path, output_path, output_format
-            )
-            results.append((pdf_path, count, None))
-        except Exception as e:
-            results.append((pdf_path, 0, str(e)))
+            # Detection runs in worker processes. Fake values and outputs are
+            # produced here, in file order, so mappings match a sequential run.
+            # spaCy/Presidio are not fork-safe, hence the spawn context.
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_detection_worker,
+                initargs=(anonymizer.language, cache_dir, use_gpu),
+            ) as executor:
+                futures = [executor.submit(_detect_in_worker, p) for p in pdf_files]
+
+                for i, (pdf_path, future) in enumerate(zip(pdf_files, futures)):
+                    if progress_callback:
+                        progress_callback(i, len(pdf_files), pdf_path.name)
+
+                    try:
+                        text, detections = future.result()
+                        count, _ = anonymizer._write_anonymized(
+                            pdf_path, output_path_for(pdf_path), text, detections,
+                            output_format, save_mappings=False,
+                        )
+                        results.append((pdf_path, count, None))
+                    except Exception as e:
+                        results.append((pdf_path, 0, str(e)))
+    finally:
+        # Written once for the whole batch, even if it was interrupted,
+        # so every output produced so far stays reversible
+        anonymizer.mapping_store.save()
 
     if progress_callback:
         progress_callback(len(pdf_files), len(pdf_files), "Done")
 
     return results
+
+
+def _detect_cached(
+    get_detector: Callable[[], "PIIDetector"],
+    cache: Optional[DetectionCache],
+    text: str,
+    pages: List[Tuple[int, str]],
+    language: str,
+    model_name: Optional[str],
+) -> List[dict]:
+    """Detect PII in text, consulting the detection cache first when enabled."""
+    if cache is not None:
+        detections = cache.get(text, language, model_name)
+        if detections is not None:
+            return detections
+
+    detections = get_detector().detect_with_context(text, pages=pages)
+
+    if cache is not None:
+        cache.set(text, language, model_name, detections)
+    return detections
+
+
+# Per-process state for parallel detection, built once by the pool initializer
+_worker_detector: Optional["PIIDetector"] = None
+_worker_pdf_handler: Optional[PDFHandler] = None
+_worker_cache: Optional[DetectionCache] = None
+_worker_language = "en"
+
+
+def _init_detection_worker(
+    language: str,
+    cache_dir: Optional[Path],
+    use_gpu: bool = False,
+) -> None:
+    """Load the detection engines once per worker process."""
+    from .detector import PIIDetector
+
+    global _worker_detector, _worker_pdf_handler, _worker_cache, _worker_language
+    _worker_detector = PIIDetector(language=language, use_gpu=use_gpu)
+    _worker_pdf_handler = PDFHandler()
+    _worker_cache = DetectionCache(cache_dir) if cache_dir else None
+    _worker_language = language
+
+
+def _detect_in_worker(pdf_path: Path) -> Tuple[str, List[dict]]:
+    """Extract text from a PDF and detect its PII (runs in a worker process)."""
+    text, pages = _worker_pdf_handler.extract_text_with_offsets(pdf_path)
+    detections = _detect_cached(
+        lambda: _worker_detector, _worker_cache, text, pages, _worker_language,
+        _worker_detector.model_name,
+    )
+    return text, detections
@@ -0,0 +1,84 @@
+"""On-disk cache of PII detections keyed by document content."""
+
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import List, Optional
+
+import orjson
+
+# Bump when recognizers or result filtering (length/confidence thresholds,
+# blocklists) change to invalidate old entries
+DETECTION_CACHE_VERSION = "v2"
+
+
+class DetectionCache:
+    """
+    Persist detection results so unchanged documents skip PII detection.
+
+    Entries are keyed by a hash of the extracted text, the cache version,
+    the language and the spaCy model (CPU and GPU pipelines detect
+    differently). Only entity types, offsets and scores are stored; the PII
+    values themselves are re-read from the text on a hit.
+    """
+
+    def __init__(self, cache_dir: Path):
+        cache_dir = Path(cache_dir).expanduser()
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # WAL lets parallel workers read while another one writes
+        self._conn = sqlite3.connect(
+            str(cache_dir / "detections.sqlite3"), timeout=30, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS detections (key TEXT PRIMARY KEY, results BLOB NOT NULL)"
+        )
+
+    @staticmethod
+    def _key(text: str, language: str, model_name: str) -> str:
+        """Build the cache key for a document's text."""
+        digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16)
+        return f"{digest.hexdigest()}:{DETECTION_CACHE_VERSION}:{language}:{model_name}"
+
+    def get(self, text: str, language: str, model_name: str) -> Optional[List[dict]]:
+        """
+        Look up cached detections for a text.
+
+        Args:
+            text: Extracted document text
+            language: Detection language
+            model_name: spaCy model the detector runs
+
+        Returns:
+            Detections in the same form as detect_with_context, or None on a miss
+        """
+        row = self._conn.execute(
+            "SELECT results FROM detections WHERE key = ?", (self._key(text, language, model_name),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        return [
+            {
+                "entity_type": entity_type,
+                "value": text[start:end],
+                "start": start,
+                "end": end,
+                "score": score,
+            }
+            for entity_type, start, end, score in orjson.loads(row[0])
+        ]
+
+    def set(self, text: str, language: str, model_name: str, detections: List[dict]) -> None:
+        """Store detections for a text."""
+        results = orjson.dumps(
+            [(d["entity_type"], d["start"], d["end"], d["score"]) for d in detections]
+        )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO detections (key, results) VALUES (?, ?)",
+            (self._key(text, language, model_name), results),
+        )
+
+    def close(self) -> None:
+        """Close the underlying database."""
+        self._conn.close()
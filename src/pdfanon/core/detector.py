@@ -1,10 +1,18 @@
 """PII detection using Microsoft Presidio."""
 
+import functools
 import subprocess
 import sys
-from typing import List, Optional
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
 
-from presidio_analyzer import AnalyzerEngine, RecognizerResult
+from . import fast_regex
+
+if TYPE_CHECKING:
+    # Presidio takes seconds to import; it's loaded when an engine is built
+    from presidio_analyzer import AnalyzerEngine, RecognizerResult
+    from presidio_analyzer.nlp_engine import NlpEngine
 
 
 # Supported entity types for detection
@@ -22,6 +30,10 @@ SUPPORTED_ENTITIES = [
     "US_BANK_NUMBER",
     "US_PASSPORT",
 ]
+_SUPPORTED_ENTITY_SET = frozenset(SUPPORTED_ENTITIES)
+
+# Pages per spaCy batch when analyzing a document page by page
+PAGE_BATCH_SIZE = 16
 
 # Minimum character length for each entity type to reduce false positives
 MIN_LENGTH_BY_ENTITY = {
@@ -57,7 +69,7 @@ MIN_CONFIDENCE_BY_ENTITY = {
 DEFAULT_MIN_CONFIDENCE = 0.6
 
 # Common false positives to ignore (case-insensitive)
-BLOCKLIST = {
+BLOCKLIST = frozenset({
     # Medical abbreviations
     "tibc", "t3", "t4", "im", "iv", "ng", "mg", "dl", "ml", "ul",
     "mcg", "iu", "ph", "hba1c", "ldl", "hdl", "alt", "ast", "bun",
@@ -67,45 +79,163 @@ BLOCKLIST = {
     "in", "on", "at", "to", "of", "is", "it", "as", "or", "an",
     # Units and measurements
     "range", "reference", "normal", "high", "low", "final", "status",
-}
+})
 
 # US state abbreviations - often falsely detected as locations
-STATE_ABBREVS = {
+STATE_ABBREVS = frozenset({
     "tx", "ca", "fl", "md", "ny", "pa", "il", "oh", "ga", "nc",
     "mi", "nj", "va", "wa", "az", "ma", "tn", "in", "mo", "wi",
     "mn", "co", "al", "sc", "la", "ky", "or", "ok", "ct", "ia",
     "ut", "nv", "ar", "ms", "ks", "nm", "ne", "wv", "id", "hi",
     "nh", "me", "ri", "mt", "de", "sd", "nd", "ak", "dc", "vt", "wy",
-}
+})
+
+
+# spaCy pipelines: the CNN model runs well on CPU, the transformer needs a GPU
+DEFAULT_SPACY_MODEL = "en_core_web_lg"
+GPU_SPACY_MODEL = "en_core_web_trf"
+
+
+@functools.lru_cache(maxsize=None)
+def select_spacy_model(use_gpu: bool = False) -> str:
+    """
+    Pick the spaCy pipeline a detector will run, without loading it.
 
+    The transformer pipeline only pays off on CUDA; without a usable GPU
+    we stay on the CPU model.
+    """
+    if not use_gpu:
+        return DEFAULT_SPACY_MODEL
 
-def ensure_spacy_model(model_name: str = "en_core_web_lg") -> None:
+    import spacy
+    if spacy.prefer_gpu():
+        return GPU_SPACY_MODEL
+    print("Warning: No GPU available, using the CPU model.")
+    return DEFAULT_SPACY_MODEL
+
+
+# Serializes engine construction so concurrent detectors share one engine
+_ENGINE_LOCK = threading.RLock()
+
+
+@functools.lru_cache(maxsize=None)
+def ensure_spacy_model(model_name: str = DEFAULT_SPACY_MODEL) -> None:
     """Ensure spaCy model is installed, download if needed."""
+    import spacy
+
+    # Check for an installed package or a model directory instead of
+    # loading it; the analyzer loads the model itself, so a trial load
+    # would read it twice
+    if spacy.util.is_package(model_name) or Path(model_name).exists():
+        return
+
+    # Models spaCy can still resolve otherwise (e.g. linked ones) load fine
     try:
-        import spacy
         spacy.load(model_name)
+        return
     except OSError:
-        print(f"Downloading spaCy model '{model_name}' (this may take a few minutes)...")
-        subprocess.run(
-            [sys.executable, "-m", "spacy", "download", model_name],
-            check=True
-        )
-        print(f"Model '{model_name}' downloaded successfully.")
+        pass
+
+    print(f"Downloading spaCy model '{model_name}' (this may take a few minutes)...")
+    subprocess.run(
+        [sys.executable, "-m", "spacy", "download", model_name],
+        check=True
+    )
+    print(f"Model '{model_name}' downloaded successfully.")
+
+
+def _get_analyzer(language: str, model_name: str = DEFAULT_SPACY_MODEL) -> "AnalyzerEngine":
+    """
+    Get the Presidio analyzer for a language and model, built once per process.
+
+    Construction loads the spaCy model (hundreds of MB, seconds), so every
+    detector in the process shares one engine, including across threads.
+    """
+    with _ENGINE_LOCK:
+        return _build_analyzer(language, model_name)
+
+
+def _get_nlp_engine(language: str, model_name: str = DEFAULT_SPACY_MODEL) -> "NlpEngine":
+    """
+    Get the spaCy NLP engine for a language and model, loaded once per process.
+
+    The model is the bulk of the analyzer's memory, so every analyzer
+    built for the same model shares one engine instead of loading its own.
+    """
+    with _ENGINE_LOCK:
+        return _build_nlp_engine(language, model_name)
+
+
+@functools.lru_cache(maxsize=4)
+def _build_nlp_engine(language: str, model_name: str) -> "NlpEngine":
+    """Load a spaCy NLP engine; call through _get_nlp_engine."""
+    from presidio_analyzer.nlp_engine import NlpEngineProvider
+
+    ensure_spacy_model(model_name)
+    return NlpEngineProvider(nlp_configuration={
+        "nlp_engine_name": "spacy",
+        "models": [{"lang_code": language, "model_name": model_name}],
+    }).create_engine()
+
+
+@functools.lru_cache(maxsize=4)
+def _build_analyzer(language: str, model_name: str) -> "AnalyzerEngine":
+    """Build and warm up a Presidio analyzer; call through _get_analyzer."""
+    from presidio_analyzer import AnalyzerEngine, RecognizerRegistry
+
+    nlp_engine = _get_nlp_engine(language, model_name)
+
+    # Only keep recognizers for entities we detect; Presidio runs every
+    # registered recognizer on each call (UK_NHS, AU_ABN, ES_NIF, ...)
+    registry = RecognizerRegistry()
+    registry.supported_languages = [language]
+    registry.load_predefined_recognizers(languages=[language], nlp_engine=nlp_engine)
+    registry.recognizers = [
+        recognizer for recognizer in registry.recognizers
+        if not _SUPPORTED_ENTITY_SET.isdisjoint(recognizer.supported_entities)
+    ]
+
+    analyzer = AnalyzerEngine(
+        registry=registry, nlp_engine=nlp_engine, supported_languages=[language]
+    )
+    # Run the pipeline once so the first real document doesn't pay warm-up
+    analyzer.analyze(text="Warm up the pipeline.", language=language)
+    return analyzer
+
+
+def _get_prefilter(
+    language: str,
+    model_name: str = DEFAULT_SPACY_MODEL,
+) -> Optional[fast_regex.PatternPrefilter]:
+    """Get the recognizer prefilter for an analyzer, if a backend is available."""
+    if not fast_regex.available():
+        return None
+    with _ENGINE_LOCK:
+        return _build_prefilter(language, model_name)
+
+
+@functools.lru_cache(maxsize=4)
+def _build_prefilter(language: str, model_name: str) -> fast_regex.PatternPrefilter:
+    """Compile the prefilter for an analyzer; call through _get_prefilter."""
+    return fast_regex.PatternPrefilter(_get_analyzer(language, model_name), language)
 
 
 class PIIDetector:
     """Detects PII entities in text using Presidio."""
 
-    def __init__(self, language: str = "en"):
+    def __init__(self, language: str = "en", use_gpu: bool = False):
         self.language = language
-        ensure_spacy_model()
-        self.analyzer = AnalyzerEngine()
+        self.model_name = select_spacy_model(use_gpu)
+        self.analyzer = _get_analyzer(language, self.model_name)
+
+        # One-pass Hyperscan/RE2 scan to skip regex recognizers that cannot match
+        self.prefilter = _get_prefilter(language, self.model_name)
 
     def detect(
         self,
         text: str,
         entities: Optional[List[str]] = None,
-    ) -> List[RecognizerResult]:
+    ) -> List["RecognizerResult"]:
         """
         Detect PII entities in the given text.
 
@@ -119,6 +249,12 @@ class PIIDetector:
         if entities is None:
             entities = SUPPORTED_ENTITIES
 
+        if self.prefilter is not None:
+            entities = self.prefilter.filter_entities(text, entities)
+            if not entities:
+                # Presidio treats an empty list as "all entities"
+                return []
+
         results = self.analyzer.analyze(
             text=text,
             language=self.language,
@@ -126,41 +262,113 @@ class PIIDetector:
         )
         return results
 
+    def detect_batch(
+        self,
+        texts: Iterable[str],
+        entities: Optional[List[str]] = None,
+    ) -> Iterator[List["RecognizerResult"]]:
+        """
+        Detect PII in many texts, streaming them through spaCy in batches.
+
+        Texts are consumed lazily, so a generator of pages keeps memory
+        bounded to one batch. Equivalent to Presidio's BatchAnalyzerEngine,
+        but each text still goes through the regex prefilter.
+
+        Args:
+            texts: Texts to analyze
+            entities: List of entity types to detect (defaults to SUPPORTED_ENTITIES)
+
+        Yields:
+            List of RecognizerResult per text, in input order
+        """
+        if entities is None:
+            entities = SUPPORTED_ENTITIES
+
+        nlp_batches = self.analyzer.nlp_engine.process_batch(
+            texts,
+            language=self.language,
+            batch_size=PAGE_BATCH_SIZE,
+        )
+
+        for text, nlp_artifacts in nlp_batches:
+            text_entities = entities
+            if self.prefilter is not None:
+                text_entities = self.prefilter.filter_entities(text, entities)
+                if not text_entities:
+                    yield []
+                    continue
+
+            yield self.analyzer.analyze(
+                text=text,
+                language=self.language,
+                entities=text_entities,
+                nlp_artifacts=nlp_artifacts,
+            )
+
+    def detect_pages(
+        self,
+        pages: List[Tuple[int, str]],
+        entities: Optional[List[str]] = None,
+    ) -> List["RecognizerResult"]:
+        """
+        Detect PII page by page, batching the pages through spaCy.
+
+        Args:
+            pages: List of (offset, page_text) tuples
+            entities: List of entity types to detect (defaults to SUPPORTED_ENTITIES)
+
+        Returns:
+            List of RecognizerResult with offsets into the combined text
+        """
+        results = []
+        page_results = self.detect_batch((text for _, text in pages), entities)
+        for (offset, _), page_result in zip(pages, page_results):
+            for r in page_result:
+                r.start += offset
+                r.end += offset
+                results.append(r)
+        return results
+
     def _filter_results(
         self,
-        results: List[RecognizerResult],
+        results: List["RecognizerResult"],
         text: str,
-    ) -> List[RecognizerResult]:
+    ) -> List["RecognizerResult"]:
         """
         Filter out false positive PII detections.
 
         Applies minimum length, confidence thresholds, and blocklist filtering.
         """
         filtered = []
+        min_length = MIN_LENGTH_BY_ENTITY.get
+        min_confidence = MIN_CONFIDENCE_BY_ENTITY.get
+        keep = filtered.append
 
+        # Cheap checks on the result first; the value is only sliced out
+        # of the text for results that survive them
         for r in results:
-            value = text[r.start:r.end]
             entity_type = r.entity_type
 
             # Check minimum length
-            min_len = MIN_LENGTH_BY_ENTITY.get(entity_type, 3)
-            if len(value) < min_len:
+            min_len = min_length(entity_type, 3)
+            if r.end - r.start < min_len:
                 continue
 
             # Check confidence threshold
-            min_conf = MIN_CONFIDENCE_BY_ENTITY.get(entity_type, DEFAULT_MIN_CONFIDENCE)
+            min_conf = min_confidence(entity_type, DEFAULT_MIN_CONFIDENCE)
             if r.score < min_conf:
                 continue
 
             # Check blocklist
-            if value.lower().strip() in BLOCKLIST:
+            lowered = text[r.start:r.end].lower()
+            if lowered.strip() in BLOCKLIST:
                 continue
 
             # For LOCATION, also check state abbreviations (standalone only)
-            if entity_type == "LOCATION" and value.lower() in STATE_ABBREVS:
+            if entity_type == "LOCATION" and lowered in STATE_ABBREVS:
                 continue
 
-            filtered.append(r)
+            keep(r)
 
         return filtered
 
@@ -168,6 +376,7 @@ class PIIDetector:
         self,
         text: str,
         entities: Optional[List[str]] = None,
+        pages: Optional[List[Tuple[int, str]]] = None,
     ) -> List[dict]:
         """
         Detect PII and return results with extracted values.
@@ -175,11 +384,16 @@ class PIIDetector:
         Args:
             text: Text to analyze
             entities: List of entity types to detect
+            pages: Optional (offset, page_text) split of text; when given,
+                pages are analyzed individually in batches
 
         Returns:
             List of dicts with entity_type, value, start, end, score
         """
-        results = self.detect(text, entities)
+        if pages is not None:
+            results = self.detect_pages(pages, entities)
+        else:
+            results = self.detect(text, entities)
 
         # Apply filtering to reduce false positives
         results = self._filter_results(results, text)
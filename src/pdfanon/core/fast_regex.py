@@ -0,0 +1,175 @@
+"""Single-pass prefiltering of Presidio's regex recognizers."""
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+if TYPE_CHECKING:
+    from presidio_analyzer import AnalyzerEngine
+
+try:
+    import hyperscan
+except ImportError:  # Optional accelerator (pip install pdfanon[fast])
+    hyperscan = None
+
+try:
+    import re2
+except ImportError:  # Optional accelerator (pip install pdfanon[fast])
+    re2 = None
+
+
+def available() -> bool:
+    """Whether any prefilter backend is installed."""
+    return hyperscan is not None or re2 is not None
+
+
+class PatternPrefilter:
+    """
+    Decide which regex-only entity types can possibly match a text.
+
+    Compiles the patterns of every PatternRecognizer into one multi-pattern
+    matcher and scans the text once: a Hyperscan database in prefilter mode
+    when available, otherwise an RE2 set (a single DFA, portable to
+    platforms Hyperscan doesn't support). Entity types served only by
+    pattern recognizers whose patterns never fired are dropped from the
+    Presidio call, skipping their Python regex passes entirely.
+
+    Presidio still runs every recognizer that did fire, so validation
+    (Luhn checks, invalid SSN ranges) and context scoring are unchanged.
+    """
+
+    def __init__(self, analyzer: "AnalyzerEngine", language: str = "en"):
+        if not available():
+            raise ImportError("neither hyperscan nor re2 is installed")
+
+        self.backend = "hyperscan" if hyperscan is not None else "re2"
+
+        # Entity types that must always be analyzed (NER, phonenumbers, etc.)
+        self._always: Set[str] = set()
+        # Entity type -> ids of the patterns that can produce it
+        self._pattern_ids: Dict[str, Set[int]] = {}
+
+        expressions: List[str] = []
+        recognizers = analyzer.registry.get_recognizers(language=language, all_fields=True)
+        for recognizer in recognizers:
+            ids = self._register_patterns(recognizer, expressions)
+            for entity in recognizer.supported_entities:
+                if ids is None:
+                    self._always.add(entity)
+                else:
+                    self._pattern_ids.setdefault(entity, set()).update(ids)
+
+        self._database = None
+        self._set = None
+        if not expressions:
+            return
+
+        if self.backend == "hyperscan":
+            self._database = hyperscan.Database()
+            self._database.compile(
+                expressions=[e.encode("utf-8") for e in expressions],
+                ids=list(range(len(expressions))),
+                elements=len(expressions),
+                flags=[_HYPERSCAN_FLAGS] * len(expressions),
+            )
+        else:
+            self._set = _new_re2_set()
+            for expression in expressions:
+                self._set.Add(_re2_expression(expression))
+            self._set.Compile()
+
+    def _register_patterns(self, recognizer, expressions: List[str]) -> Optional[List[int]]:
+        """
+        Register a recognizer's patterns for the shared matcher.
+
+        Returns:
+            Pattern ids, or None if the recognizer cannot be prefiltered
+        """
+        from presidio_analyzer import PatternRecognizer
+
+        if not isinstance(recognizer, PatternRecognizer) or not recognizer.patterns:
+            return None
+
+        candidates = [p.regex for p in recognizer.patterns]
+        # Patterns the backend rejects (lookarounds, backreferences) run unfiltered
+        if not all(self._accepts(expression) for expression in candidates):
+            return None
+
+        start = len(expressions)
+        expressions.extend(candidates)
+        return list(range(start, len(expressions)))
+
+    def _accepts(self, expression: str) -> bool:
+        """Test-compile a single pattern with the active backend."""
+        if self.backend == "hyperscan":
+            try:
+                hyperscan.Database().compile(
+                    expressions=[expression.encode("utf-8")], flags=_HYPERSCAN_FLAGS
+                )
+            except hyperscan.error:
+                return False
+            return True
+
+        try:
+            _new_re2_set().Add(_re2_expression(expression))
+        except re2.error:
+            return False
+        return True
+
+    def _scan(self, text: str) -> Set[int]:
+        """Return the ids of all patterns with at least one match."""
+        matched: Set[int] = set()
+
+        if self._database is not None:
+            def on_match(pattern_id, start, end, flags, context):
+                matched.add(pattern_id)
+
+            self._database.scan(text.encode("utf-8", "replace"), match_event_handler=on_match)
+        elif self._set is not None:
+            matched.update(self._set.Match(text.encode("utf-8", "replace")) or ())
+
+        return matched
+
+    def filter_entities(self, text: str, entities: List[str]) -> List[str]:
+        """
+        Drop entity types that cannot match anywhere in the text.
+
+        Args:
+            text: Text about to be analyzed
+            entities: Entity types requested from Presidio
+
+        Returns:
+            The subset of entities worth running recognizers for
+        """
+        matched = self._scan(text)
+        return [
+            entity for entity in entities
+            if entity in self._always
+            or entity not in self._pattern_ids
+            or not self._pattern_ids[entity].isdisjoint(matched)
+        ]
+
+
+# Mirror Presidio's default regex flags (IGNORECASE | DOTALL | MULTILINE)
+if hyperscan is not None:
+    _HYPERSCAN_FLAGS = (
+        hyperscan.HS_FLAG_PREFILTER
+        | hyperscan.HS_FLAG_SINGLEMATCH
+        | hyperscan.HS_FLAG_ALLOWEMPTY
+        | hyperscan.HS_FLAG_CASELESS
+        | hyperscan.HS_FLAG_DOTALL
+        | hyperscan.HS_FLAG_MULTILINE
+        | hyperscan.HS_FLAG_UTF8
+        | hyperscan.HS_FLAG_UCP
+    )
+
+
+def _new_re2_set():
+    """Create an unanchored RE2 set with Presidio-compatible options."""
+    options = re2.Options()
+    options.case_sensitive = False
+    options.dot_nl = True
+    return re2.Set.SearchSet(options)
+
+
+def _re2_expression(expression: str) -> bytes:
+    """Encode a pattern for RE2, enabling multi-line anchors."""
+    return f"(?m){expression}".encode("utf-8")
@@ -1,14 +1,102 @@
 """PDF reading and writing with anonymization support."""
 
+import html
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 
-import pymupdf
+from .replacer import TextReplacer
+
+if TYPE_CHECKING:
+    # The PDF engines are imported where they're used, so loading this
+    # module (e.g. to reverse a text file) doesn't pull in either library
+    import pymupdf
+
+# Text extraction backends
+EXTRACTION_BACKENDS = ("pdfium", "pymupdf")
+
+# Documents below this many pages are planned in-process. Spawning the
+# workers costs 1-1.5 s, while planning takes ~30 ms for a page dense with
+# PII and ~3 ms for one without; at this size four workers come out ahead
+# unless most pages hold no PII at all
+PARALLEL_MIN_PAGES = 256
+
+# Lines laid out per pymupdf.Story in create_pdf_from_text, about a page
+STORY_LINES = 50
+
+# Header that precedes each page in the combined extracted text
+PAGE_HEADER = "--- Page {} ---\n".format
+
+# Rect coordinates as plain floats: (x0, y0, x1, y1)
+Rect = Tuple[float, float, float, float]
+
+# A planned redaction: (rect coordinates, replacement text, font size)
+Redaction = Tuple[Rect, str, float]
+
+# Height in points of the rows spans and placed redactions are bucketed
+# by, so overlap checks only look at nearby text; about half a line
+# of body text
+ROW_HEIGHT = 6.0
 
 
 class PDFHandler:
     """Handles PDF reading and writing with text replacement."""
 
+    def __init__(self, backend: str = "pdfium", page_workers: Optional[int] = 1):
+        if backend not in EXTRACTION_BACKENDS:
+            raise ValueError(f"Unknown extraction backend: {backend}")
+        self.backend = backend
+        # Processes used to plan redactions for large PDFs (None for one per CPU)
+        self.page_workers = page_workers or os.cpu_count() or 1
+
+    def _extract_pages(self, pdf_path: Path) -> List[Tuple[int, str]]:
+        """
+        Extract the text of every page with the configured backend.
+
+        pdfium reads whole pages through its range extractor, which is
+        faster than PyMuPDF's layout-aware get_text(). Files pdfium cannot
+        open (e.g. encrypted ones) fall back to PyMuPDF.
+        """
+        import pymupdf
+        import pypdfium2 as pdfium
+
+        if not pdf_path.exists():
+            raise FileNotFoundError(f"PDF not found: {pdf_path}")
+
+        if self.backend == "pdfium":
+            try:
+                return self._extract_pages_pdfium(pdf_path)
+            except pdfium.PdfiumError:
+                pass
+
+        pages = []
+        with pymupdf.open(str(pdf_path)) as doc:
+            for page_num, page in enumerate(doc, 1):
+                pages.append((page_num, page.get_text()))
+        return pages
+
+    def _extract_pages_pdfium(self, pdf_path: Path) -> List[Tuple[int, str]]:
+        """Extract page text using pypdfium2."""
+        import pypdfium2 as pdfium
+
+        pages = []
+        pdf = pdfium.PdfDocument(str(pdf_path))
+        try:
+            for page_index in range(len(pdf)):
+                page = pdf[page_index]
+                textpage = page.get_textpage()
+                # pdfium separates lines with CRLF
+                text = textpage.get_text_range().replace("\r\n", "\n")
+                # Close explicitly rather than leaving it to finalizers
+                textpage.close()
+                page.close()
+                pages.append((page_index + 1, text))
+        finally:
+            pdf.close()
+        return pages
+
     def extract_text(self, pdf_path: Path) -> str:
         """
         Extract all text from a PDF file.
@@ -19,17 +107,36 @@ class PDFHandler:
         Returns:
             Extracted text with page markers
         """
-        if not pdf_path.exists():
-            raise FileNotFoundError(f"PDF not found: {pdf_path}")
+        return self.extract_text_with_offsets(pdf_path)[0]
 
-        text_parts = []
-        with pymupdf.open(str(pdf_path)) as doc:
-            for page_num, page in enumerate(doc, 1):
-                text = page.get_text()
-                if text.strip():
-                    text_parts.append(f"--- Page {page_num} ---\n{text}")
+    def extract_text_with_offsets(self, pdf_path: Path) -> Tuple[str, List[Tuple[int, str]]]:
+        """
+        Extract all text, also returning where each page's text starts.
+
+        Lets callers analyze pages independently and map results back
+        onto the combined text.
 
-        return "\n\n".join(text_parts)
+        Args:
+            pdf_path: Path to the PDF file
+
+        Returns:
+            Tuple of (text with page markers, list of (offset, page_text))
+            for every non-empty page
+        """
+        text_parts = []
+        pages = []
+        offset = 0
+        for page_num, text in self._extract_pages(pdf_path):
+            # isspace() scans without copying the page like strip() would
+            if text and not text.isspace():
+                header = PAGE_HEADER(page_num)
+                if text_parts:
+                    offset += 2  # "\n\n" separator
+                pages.append((offset + len(header), text))
+                text_parts.append(header + text)
+                offset += len(header) + len(text)
+
+        return "\n\n".join(text_parts), pages
 
     def extract_text_by_page(self, pdf_path: Path) -> List[Tuple[int, str]]:
         """
@@ -41,16 +148,7 @@ class PDFHandler:
         Returns:
             List of (page_number, text) tuples
         """
-        if not pdf_path.exists():
-            raise FileNotFoundError(f"PDF not found: {pdf_path}")
-
-        pages = []
-        with pymupdf.open(str(pdf_path)) as doc:
-            for page_num, page in enumerate(doc, 1):
-                text = page.get_text()
-                pages.append((page_num, text))
-
-        return pages
+        return self._extract_pages(pdf_path)
 
     def create_anonymized_pdf(
         self,
@@ -61,7 +159,12 @@ class PDFHandler:
         """
         Create an anonymized PDF by replacing text.
 
-        Uses PyMuPDF's redaction API to search for and replace text.
+        Uses PyMuPDF's redaction API to search for and replace text. Each
+        page's text is read once and scanned for all originals in a single
+        pass; only values actually present are searched for and redacted,
+        and pages without PII are left untouched. For large documents the
+        searching is spread over page_workers processes; redactions are
+        applied and saved here.
 
         Args:
             input_path: Path to the original PDF
@@ -71,24 +174,35 @@ class PDFHandler:
         Returns:
             True if successful, False if fallback to text needed
         """
+        import pymupdf
+
         if not input_path.exists():
             raise FileNotFoundError(f"PDF not found: {input_path}")
 
         try:
             doc = pymupdf.open(str(input_path))
 
-            for page in doc:
-                for original, fake in replacements.items():
-                    # Search for all instances of the original text
-                    instances = page.search_for(original)
-
-                    for rect in instances:
-                        # Add redaction annotation with replacement text
-                        page.add_redact_annot(
-                            rect,
-                            text=fake,
-                            fill=(1, 1, 1),  # White background
-                        )
+            if self.page_workers > 1 and len(doc) >= PARALLEL_MIN_PAGES:
+                plans = self._plan_redactions_parallel(input_path, len(doc), replacements)
+            else:
+                finder, originals_by_key = _build_finder(replacements)
+                plans = [
+                    (page.number, _plan_page(page, finder, originals_by_key, replacements))
+                    for page in doc
+                ]
+
+            for page_num, redactions in plans:
+                if not redactions:
+                    continue
+                page = doc[page_num]
+                for rect, fake, fontsize in redactions:
+                    # Add redaction annotation with replacement text
+                    page.add_redact_annot(
+                        pymupdf.Rect(rect),
+                        text=fake,
+                        fontsize=fontsize,
+                        fill=(1, 1, 1),  # White background
+                    )
 
                 # Apply all redactions on this page
                 page.apply_redactions()
@@ -104,6 +218,32 @@ class PDFHandler:
             print(f"Warning: PDF modification failed ({e}). Consider using text output.")
             return False
 
+    def _plan_redactions_parallel(
+        self,
+        input_path: Path,
+        page_count: int,
+        replacements: Dict[str, str],
+    ) -> List[Tuple[int, List[Redaction]]]:
+        """Search pages in worker processes, one contiguous page range each."""
+        workers = min(self.page_workers, page_count)
+        chunk = -(-page_count // workers)
+        ranges = [
+            list(range(first, min(first + chunk, page_count)))
+            for first in range(0, page_count, chunk)
+        ]
+
+        # Spawned like the detection workers; the parent may hold spaCy state
+        with ProcessPoolExecutor(
+            max_workers=len(ranges),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [
+                executor.submit(_plan_page_range, str(input_path), page_numbers, replacements)
+                for page_numbers in ranges
+            ]
+            # Collected in submission order, so pages are applied in order
+            return [plan for future in futures for plan in future.result()]
+
     def create_pdf_from_text(
         self,
         text: str,
@@ -120,31 +260,43 @@ class PDFHandler:
             output_path: Path for the output PDF
             font_size: Font size in points
         """
-        doc = pymupdf.open()
-
-        # Split text into pages (roughly 60 lines per page)
-        lines = text.split('\n')
-        lines_per_page = 55
-
-        for i in range(0, len(lines), lines_per_page):
-            page_lines = lines[i:i + lines_per_page]
-            page_text = '\n'.join(page_lines)
+        import pymupdf
 
-            # Create new page (Letter size: 612 x 792 points)
-            page = doc.new_page(width=612, height=792)
-
-            # Insert text with margins
-            rect = pymupdf.Rect(50, 50, 562, 742)
-            page.insert_textbox(
-                rect,
-                page_text,
-                fontsize=font_size,
-                fontname="helv",  # Helvetica
-            )
+        css = (
+            f"div {{font-family: sans-serif; font-size: {font_size}pt; "
+            "white-space: pre-wrap;}"
+        )
+        page_rect = pymupdf.Rect(0, 0, 612, 792)  # Letter size
+        text_rect = pymupdf.Rect(50, 50, 562, 742)  # With margins
 
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        doc.save(str(output_path))
-        doc.close()
+        writer = pymupdf.DocumentWriter(str(output_path))
+        device = writer.begin_page(page_rect)
+        where = text_rect
+        # MuPDF lays a Story out in superlinear time, so the text goes in
+        # as one Story per page-sized run of lines; each continues where
+        # the previous one stopped. Long lines wrap instead of clipping.
+        lines = text.split("\n")
+        for i in range(0, len(lines), STORY_LINES):
+            chunk = "\n".join(lines[i:i + STORY_LINES])
+            story = pymupdf.Story(html=f"<div>{html.escape(chunk)}</div>", user_css=css)
+            if where.height < 2 * font_size:
+                # Too little room left for a line; MuPDF would drop the chunk
+                writer.end_page()
+                device = writer.begin_page(page_rect)
+                where = text_rect
+            more = True
+            while more:
+                more, filled = story.place(where)
+                story.draw(device)
+                if more:
+                    writer.end_page()
+                    device = writer.begin_page(page_rect)
+                    where = text_rect
+                else:
+                    where = pymupdf.Rect(text_rect.x0, filled[3], text_rect.x1, text_rect.y1)
+        writer.end_page()
+        writer.close()
 
     def save_text(self, text: str, output_path: Path) -> None:
         """
@@ -156,3 +308,140 @@ class PDFHandler:
         """
         output_path.parent.mkdir(parents=True, exist_ok=True)
         output_path.write_text(text)
+
+
+def _build_finder(
+    replacements: Dict[str, str],
+) -> Tuple[TextReplacer, Dict[str, List[str]]]:
+    """Build the single-pass scanner over the normalized search form of every original."""
+    # Originals keyed by their normalized search form
+    originals_by_key: Dict[str, List[str]] = {}
+    for original in replacements:
+        key = _normalize_for_search(original)
+        if key:
+            originals_by_key.setdefault(key, []).append(original)
+    return TextReplacer({key: key for key in originals_by_key}), originals_by_key
+
+
+def _plan_page(
+    page: "pymupdf.Page",
+    finder: TextReplacer,
+    originals_by_key: Dict[str, List[str]],
+    replacements: Dict[str, str],
+) -> List[Redaction]:
+    """Find where on a page each present original is, and what replaces it."""
+    import pymupdf
+
+    # One text page serves the span dict and every search_for below;
+    # search_for would otherwise rebuild it on each call
+    textpage = page.get_textpage(flags=pymupdf.TEXTFLAGS_SEARCH)
+    page_dict = page.get_text("dict", textpage=textpage)
+    lines = [
+        line["spans"]
+        for block in page_dict["blocks"]
+        for line in block.get("lines", ())
+    ]
+
+    # Spans of a line abut; lines are separated by whitespace
+    page_text = _normalize_for_search(
+        " ".join("".join(span["text"] for span in line_spans) for line_spans in lines)
+    )
+    # Every key on the page, including ones overlapping another match
+    # ("Mary Ann" and "Ann Smith" in "Mary Ann Smith")
+    present = finder.find_keys(page_text)
+    if not present:
+        return []
+
+    span_sizes = _index_span_sizes(span for line_spans in lines for span in line_spans)
+
+    # Longest originals first, so a value nested in a longer one
+    # ("John" in "John Smith") doesn't redact inside its match
+    placed: Dict[int, List[Rect]] = {}
+    redactions: List[Redaction] = []
+    originals = sorted(
+        (original for key in present for original in originals_by_key[key]),
+        key=len,
+        reverse=True,
+    )
+    for original in originals:
+        for rect in page.search_for(original, textpage=textpage):
+            rect = tuple(rect)
+            if _is_covered(rect, placed):
+                continue
+            placed.setdefault(_row(rect), []).append(rect)
+            redactions.append((rect, replacements[original], _font_size_at(rect, span_sizes)))
+    return redactions
+
+
+def _plan_page_range(
+    pdf_path: str,
+    page_numbers: List[int],
+    replacements: Dict[str, str],
+) -> List[Tuple[int, List[Redaction]]]:
+    """Plan redactions for a range of pages; runs in a worker process."""
+    import pymupdf
+
+    finder, originals_by_key = _build_finder(replacements)
+    with pymupdf.open(pdf_path) as doc:
+        return [
+            (page_num, _plan_page(doc[page_num], finder, originals_by_key, replacements))
+            for page_num in page_numbers
+        ]
+
+
+def _normalize_for_search(text: str) -> str:
+    """Lowercase and collapse whitespace, mirroring how search_for matches."""
+    return " ".join(text.lower().split())
+
+
+def _is_covered(rect: Rect, placed: Dict[int, List[Rect]]) -> bool:
+    """
+    Whether a rect lies (almost) entirely inside an already redacted one.
+
+    Placed rects are bucketed by the row of their vertical centre; a rect
+    covering 90% of another shares its line, so only nearby rows are checked.
+    """
+    x0, y0, x1, y1 = rect
+    area = (x1 - x0) * (y1 - y0)
+    row = _row(rect)
+    for nearby in range(row - 1, row + 2):
+        for ox0, oy0, ox1, oy1 in placed.get(nearby, ()):
+            width = min(x1, ox1) - max(x0, ox0)
+            height = min(y1, oy1) - max(y0, oy0)
+            if width > 0 and height > 0 and width * height >= 0.9 * area:
+                return True
+    return False
+
+
+def _row(rect: Rect) -> int:
+    """Bucket for a rect's vertical centre, in steps of ROW_HEIGHT points."""
+    return int((rect[1] + rect[3]) / (2 * ROW_HEIGHT))
+
+
+def _index_span_sizes(spans: Iterable[dict]) -> Dict[int, List[Tuple[Rect, float]]]:
+    """Bucket each span's (bbox, font size) under every row its bbox spans."""
+    sizes: Dict[int, List[Tuple[Rect, float]]] = {}
+    for span in spans:
+        bbox = tuple(span["bbox"])
+        entry = (bbox, span["size"])
+        for row in range(int(bbox[1] // ROW_HEIGHT), int(bbox[3] // ROW_HEIGHT) + 1):
+            sizes.setdefault(row, []).append(entry)
+    return sizes
+
+
+def _font_size_at(
+    rect: Rect,
+    span_sizes: Dict[int, List[Tuple[Rect, float]]],
+    default: float = 11,
+) -> float:
+    """Return the font size of the text span that best overlaps a rect."""
+    x0, y0, x1, y1 = rect
+    best_size, best_area = default, 0.0
+    # A span overlapping the rect shares at least one row with it
+    for row in range(int(y0 // ROW_HEIGHT), int(y1 // ROW_HEIGHT) + 1):
+        for (sx0, sy0, sx1, sy1), size in span_sizes.get(row, ()):
+            width = min(x1, sx1) - max(x0, sx0)
+            height = min(y1, sy1) - max(y0, sy0)
+            if width > 0 and height > 0 and width * height > best_area:
+                best_size, best_area = size, width * height
+    return best_size
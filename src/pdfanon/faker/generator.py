@@ -2,10 +2,28 @@
 
 import hashlib
 import re
+import zlib
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
-from faker import Faker
+# Hashes for deriving per-value seeds: crc32 is fast; sha256 reproduces the
+# fakes generated before crc32 became the default
+SEED_HASHES = ("crc32", "sha256")
+
+# Date formats recognized in originals, tried in order; the fake date is
+# rendered in the first format the original parses with
+_DATE_FORMATS = (
+    "%B %d, %Y",  # March 15, 1985
+    "%m/%d/%Y",   # 03/15/1985
+    "%Y-%m-%d",   # 1985-03-15
+    "%d/%m/%Y",   # 15/03/1985
+    "%m-%d-%Y",   # 03-15-1985
+)
+
+_MONTH_RE = re.compile(
+    r'\b(January|February|March|April|May|June|July|August|September|October|November|December)\b'
+)
+_NON_DIGIT_RE = re.compile(r'\D')
 
 
 class DeterministicFakeGenerator:
@@ -16,13 +34,46 @@ class DeterministicFakeGenerator:
     always produces the same fake value (required for reversibility).
     """
 
-    def __init__(self, base_seed: int = 42, locale: str = "en_US"):
+    def __init__(
+        self,
+        base_seed: int = 42,
+        locale: str = "en_US",
+        deterministic_hash: str = "crc32",
+    ):
+        if deterministic_hash not in SEED_HASHES:
+            raise ValueError(f"Unknown seed hash: {deterministic_hash}")
         self.base_seed = base_seed
+        self.deterministic_hash = deterministic_hash
         self.locale = locale
+
+        # Imported here: Faker loads all its providers on import, and the
+        # mapping store imports this module for read-only commands too
+        from faker import Faker
         self.faker = Faker(locale)
 
+        # Entity type -> generator, bound once rather than on every call
+        self._dispatch = {
+            "PERSON": self._fake_person,
+            "EMAIL_ADDRESS": self._fake_email,
+            "PHONE_NUMBER": self._fake_phone,
+            "US_SSN": self._fake_ssn,
+            "DATE_TIME": self._fake_date,
+            "LOCATION": self._fake_location,
+            "US_DRIVER_LICENSE": self._fake_drivers_license,
+            "CREDIT_CARD": self._fake_credit_card,
+            "IP_ADDRESS": self._fake_ip,
+            "IBAN_CODE": self._fake_iban,
+            "US_BANK_NUMBER": self._fake_bank_number,
+            "US_PASSPORT": self._fake_passport,
+        }
+
+        # (original, entity_type) -> fake; output depends only on the key
+        self._cache: Dict[Tuple[str, str], str] = {}
+
     def _get_seed_for_value(self, original_value: str) -> int:
         """Generate deterministic seed from original value."""
+        if self.deterministic_hash == "crc32":
+            return zlib.crc32(original_value.encode()) ^ self.base_seed
         hash_bytes = hashlib.sha256(original_value.encode()).digest()
         return int.from_bytes(hash_bytes[:4], 'big') ^ self.base_seed
 
@@ -37,26 +88,17 @@ class DeterministicFakeGenerator:
         Returns:
             A realistic fake replacement value
         """
+        key = (original_value, entity_type)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
         seed = self._get_seed_for_value(original_value)
         self.faker.seed_instance(seed)
 
-        generators = {
-            "PERSON": self._fake_person,
-            "EMAIL_ADDRESS": self._fake_email,
-            "PHONE_NUMBER": self._fake_phone,
-            "US_SSN": self._fake_ssn,
-            "DATE_TIME": self._fake_date,
-            "LOCATION": self._fake_location,
-            "US_DRIVER_LICENSE": self._fake_drivers_license,
-            "CREDIT_CARD": self._fake_credit_card,
-            "IP_ADDRESS": self._fake_ip,
-            "IBAN_CODE": self._fake_iban,
-            "US_BANK_NUMBER": self._fake_bank_number,
-            "US_PASSPORT": self._fake_passport,
-        }
-
-        generator = generators.get(entity_type, self._fake_generic)
-        return generator(original_value)
+        generator = self._dispatch.get(entity_type, self._fake_generic)
+        fake = self._cache[key] = generator(original_value)
+        return fake
 
     def _fake_person(self, original: str) -> str:
         """Generate a fake person name."""
@@ -105,24 +147,15 @@ class DeterministicFakeGenerator:
         fake_date = self.faker.date_of_birth(minimum_age=18, maximum_age=80)
 
         # Try to detect and match common date formats
-        formats_to_try = [
-            ("%B %d, %Y", lambda d: d.strftime("%B %d, %Y")),  # March 15, 1985
-            ("%m/%d/%Y", lambda d: d.strftime("%m/%d/%Y")),    # 03/15/1985
-            ("%Y-%m-%d", lambda d: d.strftime("%Y-%m-%d")),    # 1985-03-15
-            ("%d/%m/%Y", lambda d: d.strftime("%d/%m/%Y")),    # 15/03/1985
-            ("%m-%d-%Y", lambda d: d.strftime("%m-%d-%Y")),    # 03-15-1985
-        ]
-
-        for date_format, formatter in formats_to_try:
+        for date_format in _DATE_FORMATS:
             try:
                 datetime.strptime(original, date_format)
-                return formatter(fake_date)
+                return fake_date.strftime(date_format)
             except ValueError:
                 continue
 
         # Check for month name patterns
-        month_pattern = r'\b(January|February|March|April|May|June|July|August|September|October|November|December)\b'
-        if re.search(month_pattern, original):
+        if _MONTH_RE.search(original):
             return fake_date.strftime("%B %d, %Y")
 
         # Default format
@@ -175,7 +208,7 @@ class DeterministicFakeGenerator:
 
     def _fake_bank_number(self, original: str) -> str:
         """Generate a fake bank account number."""
-        length = len(re.sub(r'\D', '', original))
+        length = len(_NON_DIGIT_RE.sub('', original))
         if length == 0:
             length = 10
         return ''.join([str(self.faker.random_int(0, 9)) for _ in range(length)])
@@ -1,10 +1,14 @@
 """Bidirectional mapping storage for PII anonymization."""
 
-import json
+import os
+import sqlite3
+import time
 from dataclasses import asdict, dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional, Union
+
+import orjson
 
 from .generator import DeterministicFakeGenerator
 
@@ -19,26 +23,87 @@ class PIIMapping:
     timestamp: str
 
 
+# Version written to JSON mapping files and exports
+MAPPING_FORMAT_VERSION = "2.0"
+
+# Mapping files with these suffixes are stored in SQLite instead of JSON
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+# Timestamps are refreshed at most this often (seconds); mappings created
+# within the same window share one
+TIMESTAMP_RESOLUTION = 1.0
+
+_timestamp_cache = (float("-inf"), "")
+
+
+def _now_iso() -> str:
+    """Current local time in ISO format, reformatted at most once per window."""
+    global _timestamp_cache
+    checked, formatted = _timestamp_cache
+    now = time.monotonic()
+    if now - checked >= TIMESTAMP_RESOLUTION:
+        formatted = datetime.now().isoformat()
+        _timestamp_cache = (now, formatted)
+    return formatted
+
+
+def _generate_unique_fake(
+    normalized: str,
+    entity_type: str,
+    generator: DeterministicFakeGenerator,
+    is_taken: Callable[[str], bool],
+) -> str:
+    """Generate a fake value not already used for another original."""
+    fake = generator.generate(normalized, entity_type)
+
+    # Handle collision (unlikely but possible)
+    collision_count = 0
+    original_fake = fake
+    while is_taken(fake):
+        collision_count += 1
+        # Regenerate with modified input
+        fake = generator.generate(f"{normalized}_{collision_count}", entity_type)
+        if collision_count > 100:
+            # Safety valve - use a unique suffix
+            fake = f"{original_fake}_{collision_count}"
+            break
+    return fake
+
+
 class MappingStore:
     """
     Thread-safe bidirectional mapping storage.
 
     Stores mappings between original PII values and their fake replacements,
     enabling both anonymization and reversal.
+
+    New mappings are appended to an NDJSON log next to the mapping file as
+    they are created, so a run that dies before save() loses nothing.
+    save() compacts the log into the JSON snapshot and removes it.
     """
 
     def __init__(self, mapping_file: Path):
         self.mapping_file = mapping_file
+        self.log_file = mapping_file.with_suffix(".ndjson")
         self.original_to_fake: Dict[str, PIIMapping] = {}
         self.fake_to_original: Dict[str, str] = {}
+        # Set when mappings change, so save() can skip redundant rewrites
+        self._dirty = False
+        self._log = None
         self._load()
+        self._replay_log()
 
     def _load(self) -> None:
         """Load existing mappings from file."""
         if self.mapping_file.exists():
             try:
-                with open(self.mapping_file, "r") as f:
-                    data = json.load(f)
+                data = orjson.loads(self.mapping_file.read_bytes())
+                if not isinstance(data, dict):
+                    raise ValueError(
+                        f"{self.mapping_file} is not a pdfanon mapping file "
+                        "(expected a JSON object with a 'mappings' list)"
+                    )
 
                 # Handle both old format (simple dict) and new format (with metadata)
                 if "mappings" in data:
@@ -56,29 +121,76 @@ class MappingStore:
                             fake=fake,
                             entity_type="UNKNOWN",
                             document="migrated",
-                            timestamp=datetime.now().isoformat(),
+                            timestamp=_now_iso(),
                         )
                         self.original_to_fake[original] = mapping
                         self.fake_to_original[fake] = original
-            except (json.JSONDecodeError, KeyError):
+            except (orjson.JSONDecodeError, KeyError):
                 # Corrupted file, start fresh
                 pass
 
+    def _replay_log(self) -> None:
+        """Apply mappings logged after the last save."""
+        if not self.log_file.exists():
+            return
+
+        data = self.log_file.read_bytes()
+        torn = False
+        for line in data.splitlines():
+            try:
+                mapping = PIIMapping(**orjson.loads(line))
+            except (orjson.JSONDecodeError, TypeError):
+                # Torn final line from an interrupted write
+                torn = True
+                continue
+            self.original_to_fake[mapping.original] = mapping
+            self.fake_to_original[mapping.fake] = mapping.original
+            self._dirty = True
+
+        if data and not data.endswith(b"\n"):
+            # Repair the tail so the next append starts on its own line
+            # instead of being glued to it and lost on the next replay
+            with open(self.log_file, "r+b") as log:
+                if torn:
+                    log.truncate(data.rfind(b"\n") + 1)
+                else:
+                    log.seek(0, os.SEEK_END)
+                    log.write(b"\n")
+
+    def _append_log(self, mapping: PIIMapping) -> None:
+        """
+        Record a new mapping ahead of the next save.
+
+        Flushed, not fsynced, per mapping: the entry survives the process
+        dying, though not an OS crash before the page cache is written back.
+        """
+        if self._log is None:
+            self.log_file.parent.mkdir(parents=True, exist_ok=True)
+            self._log = open(self.log_file, "ab")
+        self._log.write(orjson.dumps(asdict(mapping), option=orjson.OPT_APPEND_NEWLINE))
+        self._log.flush()
+
     def save(self) -> None:
-        """Save mappings to file."""
+        """Save mappings to file if they changed since the last save."""
+        if not self._dirty and self.mapping_file.exists():
+            return
+
         self.mapping_file.parent.mkdir(parents=True, exist_ok=True)
 
-        data = {
-            "version": "2.0",
-            "created": datetime.now().isoformat(),
-            "mappings": [asdict(m) for m in self.original_to_fake.values()],
-            # Also save in old format for backwards compatibility
-            "original_to_pseudo": {m.original: m.fake for m in self.original_to_fake.values()},
-            "pseudo_to_original": self.fake_to_original,
-        }
+        data = self.snapshot()
 
-        with open(self.mapping_file, "w") as f:
-            json.dump(data, f, indent=2)
+        # Write aside and swap in, so a crash mid-write never leaves a
+        # truncated mapping file behind
+        tmp_file = self.mapping_file.with_name(self.mapping_file.name + ".tmp")
+        tmp_file.write_bytes(orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE))
+        os.replace(tmp_file, self.mapping_file)
+        self._dirty = False
+
+        # Everything logged is now in the snapshot
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        self.log_file.unlink(missing_ok=True)
 
     def get_fake(self, original: str) -> Optional[str]:
         """Get existing fake value for an original."""
@@ -117,19 +229,9 @@ class MappingStore:
             return existing
 
         # Generate new fake value
-        fake = generator.generate(normalized, entity_type)
-
-        # Handle collision (unlikely but possible)
-        collision_count = 0
-        original_fake = fake
-        while fake in self.fake_to_original:
-            collision_count += 1
-            # Regenerate with modified input
-            fake = generator.generate(f"{normalized}_{collision_count}", entity_type)
-            if collision_count > 100:
-                # Safety valve - use a unique suffix
-                fake = f"{original_fake}_{collision_count}"
-                break
+        fake = _generate_unique_fake(
+            normalized, entity_type, generator, self.fake_to_original.__contains__
+        )
 
         # Create and store mapping
         mapping = PIIMapping(
@@ -137,10 +239,12 @@ class MappingStore:
             fake=fake,
             entity_type=entity_type,
             document=document,
-            timestamp=datetime.now().isoformat(),
+            timestamp=_now_iso(),
         )
         self.original_to_fake[normalized] = mapping
         self.fake_to_original[fake] = normalized
+        self._dirty = True
+        self._append_log(mapping)
 
         return fake
 
@@ -152,6 +256,15 @@ class MappingStore:
         """Get all fake -> original mappings."""
         return dict(self.fake_to_original)
 
+    def snapshot(self) -> dict:
+        """Get all mappings in the JSON mapping file format."""
+        return {
+            "version": MAPPING_FORMAT_VERSION,
+            "created": _now_iso(),
+            # Lookup dicts are rebuilt from this list on load
+            "mappings": [asdict(m) for m in self.original_to_fake.values()],
+        }
+
     def get_mappings_list(self) -> list:
         """Get all mappings as a list of dicts for display."""
         return [
@@ -166,3 +279,162 @@ class MappingStore:
 
     def __len__(self) -> int:
         return len(self.original_to_fake)
+
+
+class SQLiteMappingStore:
+    """
+    Bidirectional mapping storage backed by SQLite.
+
+    Same interface as MappingStore, but each new mapping is a single indexed
+    insert instead of a rewrite of the whole file, and nothing is loaded up
+    front; lookups query the database on demand. WAL journaling keeps
+    concurrent readers and writers safe.
+    """
+
+    def __init__(self, mapping_file: Path):
+        self.mapping_file = mapping_file
+        self.mapping_file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(mapping_file), timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS mappings ("
+            "original TEXT PRIMARY KEY, fake TEXT NOT NULL, entity_type TEXT NOT NULL, "
+            "document TEXT NOT NULL, timestamp TEXT NOT NULL)"
+        )
+        # Unique, so two processes can never hand out the same fake
+        try:
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ux_mappings_fake ON mappings (fake)"
+            )
+        except sqlite3.IntegrityError:
+            raise ValueError(
+                f"{mapping_file} maps several originals to the same fake value "
+                "and cannot be reversed reliably"
+            ) from None
+        # Superseded by the unique index in older mapping files
+        self._conn.execute("DROP INDEX IF EXISTS ix_mappings_fake")
+
+    def save(self) -> None:
+        """No-op: every mapping is committed as soon as it is created."""
+
+    def get_fake(self, original: str) -> Optional[str]:
+        """Get existing fake value for an original."""
+        row = self._conn.execute(
+            "SELECT fake FROM mappings WHERE original = ?", (original,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_original(self, fake: str) -> Optional[str]:
+        """Get original value for a fake."""
+        row = self._conn.execute(
+            "SELECT original FROM mappings WHERE fake = ?", (fake,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_or_create_fake(
+        self,
+        original: str,
+        entity_type: str,
+        generator: DeterministicFakeGenerator,
+        document: str = "",
+    ) -> str:
+        """
+        Get existing fake value or generate a new one.
+
+        Args:
+            original: The original PII value
+            entity_type: The Presidio entity type
+            generator: The fake data generator
+            document: Source document name for traceability
+
+        Returns:
+            The fake replacement value
+        """
+        normalized = original.strip()
+
+        existing = self.get_fake(normalized)
+        if existing:
+            return existing
+
+        while True:
+            fake = _generate_unique_fake(
+                normalized, entity_type, generator,
+                lambda candidate: self.get_original(candidate) is not None,
+            )
+
+            # Another process may have inserted the same original or taken
+            # the same fake meanwhile; whichever row landed first wins
+            self._conn.execute(
+                "INSERT OR IGNORE INTO mappings (original, fake, entity_type, document, timestamp) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (normalized, fake, entity_type, document, _now_iso()),
+            )
+            existing = self.get_fake(normalized)
+            if existing:
+                return existing
+            # The fake went to another original; the next candidate
+            # skips it now that it is taken
+
+    def get_all_mappings(self) -> Dict[str, str]:
+        """Get all original -> fake mappings."""
+        return dict(self._conn.execute("SELECT original, fake FROM mappings"))
+
+    def get_all_reverse_mappings(self) -> Dict[str, str]:
+        """Get all fake -> original mappings."""
+        return dict(self._conn.execute("SELECT fake, original FROM mappings"))
+
+    def snapshot(self) -> dict:
+        """Get all mappings in the JSON mapping file format, for export."""
+        return {
+            "version": MAPPING_FORMAT_VERSION,
+            "created": _now_iso(),
+            "mappings": [
+                asdict(PIIMapping(*row))
+                for row in self._conn.execute(
+                    "SELECT original, fake, entity_type, document, timestamp "
+                    "FROM mappings ORDER BY rowid"
+                )
+            ],
+        }
+
+    def get_mappings_list(self) -> list:
+        """Get all mappings as a list of dicts for display."""
+        return [
+            {
+                "original": original,
+                "fake": fake,
+                "type": entity_type,
+                "document": document,
+            }
+            for original, fake, entity_type, document in self._conn.execute(
+                "SELECT original, fake, entity_type, document FROM mappings ORDER BY rowid"
+            )
+        ]
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM mappings").fetchone()[0]
+
+
+def mapping_exists(mapping_file: Path) -> bool:
+    """Whether a mapping file, or the log of a not yet saved one, exists."""
+    mapping_file = Path(mapping_file)
+    if mapping_file.exists():
+        return True
+    return (
+        mapping_file.suffix.lower() not in SQLITE_SUFFIXES
+        and mapping_file.with_suffix(".ndjson").exists()
+    )
+
+
+def open_mapping_store(mapping_file: Path) -> Union[MappingStore, SQLiteMappingStore]:
+    """
+    Open the mapping store for a file, choosing the backend by suffix.
+
+    Files ending in .db, .sqlite or .sqlite3 use SQLite; anything else
+    uses the JSON format.
+    """
+    mapping_file = Path(mapping_file)
+    if mapping_file.suffix.lower() in SQLITE_SUFFIXES:
+        return SQLiteMappingStore(mapping_file)
+    return MappingStore(mapping_file)
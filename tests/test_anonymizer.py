@@ -0,0 +1,39 @@
+"""Tests for the anonymization pipeline."""
+
+import orjson
+
+from pdfanon.core.anonymizer import Anonymizer
+from pdfanon.core.replacer import REGEX_MAX_KEYS
+
+
+def test_reverse_text_file_with_many_mappings(tmp_path):
+    # More keys than the regex alternation takes, so the memory-mapped
+    # file goes through the Hyperscan or Aho-Corasick backend
+    count = REGEX_MAX_KEYS + 8
+    mappings = [
+        {
+            "original": f"Original Person {i}",
+            "fake": f"Fake Person {i:03d}",
+            "entity_type": "PERSON",
+            "document": "doc.pdf",
+            "timestamp": "2024-01-01T00:00:00",
+        }
+        for i in range(count)
+    ]
+    mapping_file = tmp_path / "mapping.json"
+    mapping_file.write_bytes(orjson.dumps({"version": "2.0", "mappings": mappings}))
+
+    input_path = tmp_path / "anonymized.txt"
+    input_path.write_text(
+        "\n".join(f"Line {i}: Fake Person {i:03d} signed.ü" for i in range(count)),
+        encoding="utf-8",
+    )
+    output_path = tmp_path / "restored.txt"
+
+    replaced = Anonymizer(mapping_file).reverse_pdf(input_path, output_path, "txt")
+
+    assert replaced == count
+    assert output_path.read_text(encoding="utf-8") == "\n".join(
+        f"Line {i}: Original Person {i} signed.ü" for i in range(count)
+    )
+
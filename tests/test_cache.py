@@ -0,0 +1,31 @@
+"""Tests for the on-disk detection cache."""
+
+from pdfanon.core import cache
+from pdfanon.core.cache import DetectionCache
+
+TEXT = "Contact John Smith at john@example.com."
+DETECTIONS = [
+    {"entity_type": "PERSON", "value": "John Smith", "start": 8, "end": 18, "score": 0.85},
+    {"entity_type": "EMAIL_ADDRESS", "value": "john@example.com", "start": 22, "end": 38, "score": 1.0},
+]
+
+
+def test_round_trip(tmp_path):
+    detection_cache = DetectionCache(tmp_path)
+    detection_cache.set(TEXT, "en", "en_core_web_lg", DETECTIONS)
+
+    assert detection_cache.get(TEXT, "en", "en_core_web_lg") == DETECTIONS
+    # Language and model are part of the key
+    assert detection_cache.get(TEXT, "de", "en_core_web_lg") is None
+    assert detection_cache.get(TEXT, "en", "en_core_web_trf") is None
+    assert detection_cache.get(TEXT + " ", "en", "en_core_web_lg") is None
+
+
+def test_entries_from_older_version_are_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "DETECTION_CACHE_VERSION", "v1")
+    old_cache = DetectionCache(tmp_path)
+    old_cache.set(TEXT, "en", "en_core_web_lg", DETECTIONS)
+    old_cache.close()
+
+    monkeypatch.setattr(cache, "DETECTION_CACHE_VERSION", "v2")
+    assert DetectionCache(tmp_path).get(TEXT, "en", "en_core_web_lg") is None
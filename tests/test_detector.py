@@ -0,0 +1,42 @@
+"""Tests for PII detection setup."""
+
+import pytest
+
+spacy = pytest.importorskip("spacy")
+
+from pdfanon.core import detector  # noqa: E402
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    """Record spaCy download attempts instead of running them."""
+    calls = []
+    monkeypatch.setattr(detector.subprocess, "run", lambda args, **kwargs: calls.append(args))
+    detector.ensure_spacy_model.cache_clear()
+    yield calls
+    detector.ensure_spacy_model.cache_clear()
+
+
+def test_ensure_spacy_model_accepts_model_directory(tmp_path, downloads):
+    model_dir = tmp_path / "model"
+    spacy.blank("en").to_disk(model_dir)
+
+    detector.ensure_spacy_model(str(model_dir))
+
+    assert downloads == []
+
+
+def test_ensure_spacy_model_accepts_loadable_model(monkeypatch, downloads):
+    # Neither a package nor a path, but spaCy resolves it (e.g. a link)
+    monkeypatch.setattr(spacy, "load", lambda name: object())
+
+    detector.ensure_spacy_model("linked_model")
+
+    assert downloads == []
+
+
+def test_ensure_spacy_model_downloads_missing_model(downloads):
+    detector.ensure_spacy_model("xx_no_such_model")
+
+    assert len(downloads) == 1
+    assert downloads[0][-1] == "xx_no_such_model"
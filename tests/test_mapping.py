@@ -0,0 +1,157 @@
+"""Tests for mapping storage."""
+
+import sqlite3
+
+import orjson
+import pytest
+
+from pdfanon.faker.generator import DeterministicFakeGenerator
+from pdfanon.faker.mapping import (
+    MappingStore,
+    SQLiteMappingStore,
+    mapping_exists,
+    open_mapping_store,
+)
+
+VALUES = [
+    ("John Smith", "PERSON"),
+    ("john@example.com", "EMAIL_ADDRESS"),
+    ("555-123-4567", "PHONE_NUMBER"),
+]
+
+
+def _create_mappings(store):
+    generator = DeterministicFakeGenerator(base_seed=42)
+    return {
+        original: store.get_or_create_fake(original, entity_type, generator, "doc.pdf")
+        for original, entity_type in VALUES
+    }
+
+
+def test_unsaved_mappings_replay_from_log(tmp_path):
+    mapping_file = tmp_path / "mapping.json"
+    fakes = _create_mappings(MappingStore(mapping_file))
+
+    # The run died before save(): only the log exists
+    assert not mapping_file.exists()
+    assert mapping_exists(mapping_file)
+
+    store = MappingStore(mapping_file)
+    assert store.get_all_mappings() == fakes
+    assert store.get_all_reverse_mappings() == {fake: original for original, fake in fakes.items()}
+
+
+def test_replay_skips_torn_last_line(tmp_path):
+    mapping_file = tmp_path / "mapping.json"
+    fakes = _create_mappings(MappingStore(mapping_file))
+    with open(mapping_file.with_suffix(".ndjson"), "ab") as log:
+        log.write(b'{"original": "Torn')
+
+    store = MappingStore(mapping_file)
+    assert store.get_all_mappings() == fakes
+
+    # A mapping logged after the torn line survives the next replay
+    generator = DeterministicFakeGenerator(base_seed=42)
+    fakes["Bob Jones"] = store.get_or_create_fake("Bob Jones", "PERSON", generator)
+
+    assert MappingStore(mapping_file).get_all_mappings() == fakes
+
+
+def test_replay_terminates_unfinished_last_line(tmp_path):
+    mapping_file = tmp_path / "mapping.json"
+    log_file = mapping_file.with_suffix(".ndjson")
+    fakes = _create_mappings(MappingStore(mapping_file))
+    # A complete entry that lost only its newline
+    log_file.write_bytes(log_file.read_bytes().rstrip(b"\n"))
+
+    store = MappingStore(mapping_file)
+    generator = DeterministicFakeGenerator(base_seed=42)
+    fakes["Bob Jones"] = store.get_or_create_fake("Bob Jones", "PERSON", generator)
+
+    assert MappingStore(mapping_file).get_all_mappings() == fakes
+
+
+def test_save_compacts_log_into_snapshot(tmp_path):
+    mapping_file = tmp_path / "mapping.json"
+    log_file = mapping_file.with_suffix(".ndjson")
+    fakes = _create_mappings(MappingStore(mapping_file))
+
+    # A later run replays the log, adds to it, and saves
+    store = MappingStore(mapping_file)
+    generator = DeterministicFakeGenerator(base_seed=42)
+    fakes["Jane Doe"] = store.get_or_create_fake("Jane Doe", "PERSON", generator)
+    store.save()
+
+    assert not log_file.exists()
+    data = orjson.loads(mapping_file.read_bytes())
+    assert {m["original"]: m["fake"] for m in data["mappings"]} == fakes
+    assert MappingStore(mapping_file).get_all_mappings() == fakes
+
+    # New mappings after the save start a fresh log on top of the snapshot
+    store.get_or_create_fake("Richard Roe", "PERSON", generator)
+    assert log_file.exists()
+    reopened = MappingStore(mapping_file)
+    assert len(reopened) == len(fakes) + 1
+    assert reopened.get_fake("Richard Roe") == store.get_fake("Richard Roe")
+
+
+def test_sqlite_store_persists_without_save(tmp_path):
+    mapping_file = tmp_path / "mapping.db"
+    store = open_mapping_store(mapping_file)
+    assert isinstance(store, SQLiteMappingStore)
+    fakes = _create_mappings(store)
+
+    reopened = open_mapping_store(mapping_file)
+    assert reopened.get_all_mappings() == fakes
+    assert reopened.get_original(fakes["John Smith"]) == "John Smith"
+    # Known originals keep their fake
+    assert _create_mappings(reopened) == fakes
+    assert len(reopened) == len(VALUES)
+    assert [m["original"] for m in reopened.snapshot()["mappings"]] == [v for v, _ in VALUES]
+
+
+def test_sqlite_store_retries_fake_taken_concurrently(tmp_path):
+    mapping_file = tmp_path / "mapping.db"
+    store = SQLiteMappingStore(mapping_file)
+    generator = DeterministicFakeGenerator(base_seed=42)
+    fake = generator.generate("John Smith", "PERSON")
+
+    # Another process takes the fake between our check and our insert
+    other = SQLiteMappingStore(mapping_file)
+    lookups = []
+
+    def get_original(candidate):
+        if not lookups:
+            lookups.append(candidate)
+            other._conn.execute(
+                "INSERT INTO mappings VALUES (?, ?, 'PERSON', 'other.pdf', '')",
+                ("Someone Else", candidate),
+            )
+            return None
+        return SQLiteMappingStore.get_original(store, candidate)
+
+    store.get_original = get_original
+
+    result = store.get_or_create_fake("John Smith", "PERSON", generator)
+
+    assert lookups == [fake]
+    assert result != fake
+    assert store.get_all_reverse_mappings() == {fake: "Someone Else", result: "John Smith"}
+
+
+def test_sqlite_store_rejects_duplicate_fakes(tmp_path):
+    mapping_file = tmp_path / "mapping.db"
+    conn = sqlite3.connect(str(mapping_file))
+    conn.execute(
+        "CREATE TABLE mappings (original TEXT PRIMARY KEY, fake TEXT NOT NULL, "
+        "entity_type TEXT NOT NULL, document TEXT NOT NULL, timestamp TEXT NOT NULL)"
+    )
+    conn.executemany(
+        "INSERT INTO mappings VALUES (?, 'Jane Roe', 'PERSON', '', '')",
+        [("John Smith",), ("Jon Smith",)],
+    )
+    conn.commit()
+    conn.close()
+
+    with pytest.raises(ValueError, match="same fake"):
+        SQLiteMappingStore(mapping_file)
@@ -0,0 +1,27 @@
+"""Tests for PDF reading and writing."""
+
+import pymupdf
+
+from pdfanon.core.pdf_handler import STORY_LINES, PDFHandler
+
+
+def test_create_pdf_from_text_keeps_every_word(tmp_path):
+    # Several Story chunks, with lines long enough to wrap
+    lines = [f"Line {i} " + "word " * (i % 40) for i in range(STORY_LINES * 5)]
+    text = "\n".join(lines)
+    output_path = tmp_path / "out.pdf"
+
+    PDFHandler().create_pdf_from_text(text, output_path)
+
+    with pymupdf.open(str(output_path)) as doc:
+        assert len(doc) > 1
+        assert " ".join(page.get_text() for page in doc).split() == text.split()
+
+
+def test_create_pdf_from_empty_text(tmp_path):
+    output_path = tmp_path / "out.pdf"
+
+    PDFHandler().create_pdf_from_text("", output_path)
+
+    with pymupdf.open(str(output_path)) as doc:
+        assert len(doc) == 1
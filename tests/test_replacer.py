@@ -0,0 +1,90 @@
+"""Tests for single-pass multi-pattern replacement."""
+
+import pytest
+
+from pdfanon.core import replacer
+from pdfanon.core.replacer import TextReplacer
+
+# Keys overlapping and nested in one another, including non-ASCII ones
+MAPPING = {
+    "Mary Ann": "Jane Roe",
+    "Ann Smith": "Joan Major",
+    "Mary Ann Smith": "Alice Brown",
+    "Ann": "Eve",
+    "Smith": "Jones",
+    "Zoë": "Chloé",
+    "Zoë Müller": "Anna Weiß",
+    "555-0100": "555-0199",
+}
+
+TEXT = (
+    "Mary Ann Smith met Ann Smith and Mary Ann. Zoë Müller, Zoë and "
+    "Annabel Smithers called 555-0100 / 555-0100555-0100."
+)
+
+
+@pytest.fixture(params=["regex", "hyperscan", "ahocorasick"])
+def make_replacer(request, monkeypatch):
+    """Build TextReplacers on one specific backend."""
+    if request.param == "regex":
+        monkeypatch.setattr(replacer, "REGEX_MAX_KEYS", len(MAPPING))
+    else:
+        monkeypatch.setattr(replacer, "REGEX_MAX_KEYS", 0)
+        if request.param == "hyperscan":
+            pytest.importorskip("hyperscan")
+        else:
+            monkeypatch.setattr(replacer, "hyperscan", None)
+
+    def make(mapping):
+        instance = TextReplacer(mapping)
+        backend = {
+            "regex": instance._pattern,
+            "hyperscan": instance._database,
+            "ahocorasick": instance._automaton,
+        }[request.param]
+        assert backend is not None
+        return instance
+
+    return make
+
+
+def test_find_resolves_leftmost_longest(make_replacer):
+    matches = make_replacer(MAPPING).find(TEXT)
+
+    assert [key for _, _, key in matches] == [
+        "Mary Ann Smith", "Ann Smith", "Mary Ann", "Zoë Müller", "Zoë",
+        "Ann", "Smith", "555-0100", "555-0100", "555-0100",
+    ]
+    assert all(TEXT[start:end] == key for start, end, key in matches)
+
+
+def test_replace(make_replacer):
+    assert make_replacer(MAPPING).replace(TEXT) == (
+        "Alice Brown met Joan Major and Jane Roe. Anna Weiß, Chloé and "
+        "Eveabel Jonesers called 555-0199 / 555-0199555-0199."
+    )
+
+
+def test_find_keys_includes_nested_keys(make_replacer):
+    assert make_replacer(MAPPING).find_keys("Mary Ann Smith") == {
+        "Mary Ann Smith", "Mary Ann", "Ann Smith", "Ann", "Smith",
+    }
+
+
+def test_bytes_match_text(make_replacer):
+    instance = make_replacer(MAPPING)
+    data = TEXT.encode("utf-8")
+
+    matches = instance.find_bytes(bytearray(data))
+
+    assert [key for _, _, key in matches] == [key for _, _, key in instance.find(TEXT)]
+    assert all(data[start:end] == key.encode("utf-8") for start, end, key in matches)
+    assert instance.apply_bytes(data, matches).decode("utf-8") == instance.replace(TEXT)
+
+
+def test_empty_mapping():
+    instance = TextReplacer({})
+
+    assert len(instance) == 0
+    assert instance.replace(TEXT) == TEXT
+    assert instance.find_bytes(TEXT.encode("utf-8")) == []